@@ -0,0 +1,63 @@
+import copy
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .cache import cached_users
+from users.constants import ADMIN_ROLE, MODERATOR_ROLE
+
+ROLE_CLAIM = "role"
+# Утверждения, которые копируются из пользователя в токен.
+USER_CLAIMS = ("username", ROLE_CLAIM, "is_staff", "is_superuser")
+
+
+class RoleAccessToken(AccessToken):
+    """Access-токен с ролью и флагами пользователя."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
+
+
+class ClaimsUser(TokenUser):
+    """Пользователь, восстановленный из утверждений токена без запроса."""
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN_ROLE or self.is_superuser or self.is_staff
+
+    @property
+    def is_moderator(self):
+        return self.role == MODERATOR_ROLE
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса к таблице пользователей.
+
+    Запросы на чтение авторизуются по утверждениям токена. Для записи
+    нужен настоящий пользователь: он берётся из кэша процесса, который
+    сбрасывается при изменении пользователя. Токены без роли, выданные
+    до появления утверждений, обрабатываются как запросы на запись.
+    """
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if self.read_only and ROLE_CLAIM in validated_token:
+            return ClaimsUser(validated_token)
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = cached_users.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cached_users.set(user_id, user)
+        # Копия, чтобы изменения в одном запросе не попали в кэш.
+        return copy.copy(user)
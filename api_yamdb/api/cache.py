@@ -0,0 +1,230 @@
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connections
+
+TABLE_VERSION_KEY = "table-version:{}"
+ENTITY_VERSION_KEY = "entity-version:{}:{}"
+# Версия имён пользователей: отзывы и комментарии показывают автора.
+AUTHORS_VERSION_KEY = "authors-version"
+# Версия всех страниц для анонимных запросов: растёт при любой записи.
+PAGES_VERSION_KEY = "pages-version"
+COUNT_KEY = "count:{}"
+RESPONSE_KEY = "response:{}"
+PAGE_KEY = "page:{}"
+LOCK_KEY = "lock:{}"
+# Пауза между проверками, пока значение считает другой процесс, в секундах.
+LOCK_POLL_INTERVAL = 0.05
+
+
+def shared_cache():
+    """Кэш версий и блокировок, общий для всех процессов сервера."""
+    return caches[settings.SHARED_CACHE]
+
+
+def new_version() -> str:
+    # Версия — случайная метка, а не счётчик: её смена не требует
+    # атомарного incr, а метка, вытесненная из кэша, не повторит
+    # прежнего значения и не оживит старые ETag и ответы.
+    return uuid.uuid4().hex
+
+
+def get_versions(keys) -> tuple:
+    """Текущие версии из SHARED_CACHE; отсутствующие создаются."""
+    shared = shared_cache()
+    versions = shared.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        for key in missing:
+            shared.add(key, new_version(), timeout=None)
+        versions.update(shared.get_many(missing))
+    return tuple(versions.get(key) for key in keys)
+
+
+def bump_version(key: str) -> None:
+    shared_cache().set(key, new_version(), timeout=None)
+
+
+def get_table_versions(tables) -> tuple:
+    """Текущие версии таблиц; версия растёт при каждой записи в таблицу."""
+    return get_versions([TABLE_VERSION_KEY.format(table) for table in tables])
+
+
+def bump_table_version(table: str) -> None:
+    """Инвалидация всех закэшированных значений, зависящих от таблицы."""
+    bump_version(TABLE_VERSION_KEY.format(table))
+
+
+def entity_version_key(model, pk) -> str:
+    """Ключ версии одного объекта: растёт при изменении его данных."""
+    return ENTITY_VERSION_KEY.format(model._meta.label_lower, pk)
+
+
+def get_or_compute(key, compute, timeout):
+    """
+    Значение из SHARED_CACHE или результат `compute()`.
+
+    Значение и блокировка лежат в общем кэше, поэтому холодный ключ
+    считает только один процесс сервера: остальные ждут его результата
+    не дольше RESPONSE_CACHE_LOCK_TIMEOUT секунд и лишь потом считают
+    сами. None из `compute()` не кэшируется.
+    """
+    shared = shared_cache()
+    value = shared.get(key)
+    if value is not None:
+        return value
+    lock = LOCK_KEY.format(key)
+    lock_timeout = settings.RESPONSE_CACHE_LOCK_TIMEOUT
+    deadline = time.monotonic() + lock_timeout
+    locked = shared.add(lock, 1, lock_timeout)
+    while not locked and time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = shared.get(key)
+        if value is not None:
+            return value
+        locked = shared.add(lock, 1, lock_timeout)
+    try:
+        value = compute()
+        if value is not None:
+            shared.set(key, value, timeout)
+    finally:
+        if locked:
+            shared.delete(lock)
+    return value
+
+
+def queryset_signature(queryset):
+    """SQL запроса и список таблиц, которые он читает."""
+    query = queryset.query.clone()
+    sql, params = query.get_compiler(queryset.db).as_sql()
+    tables = sorted(
+        {join.table_name for join in query.alias_map.values()}
+        | {queryset.model._meta.db_table}
+    )
+    return f"{sql}{params}", tables
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк по статистике базы без COUNT(*).
+
+    Доступна только для запросов без условий; None, если оценить нельзя.
+    """
+    if queryset.query.where or queryset.query.distinct:
+        return None
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            # sqlite_stat1 появляется только после ANALYZE.
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1",
+                [table],
+            )
+        elif connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+def get_cached_count(queryset) -> int:
+    """
+    Число строк запроса для пагинации.
+
+    Значение кэшируется по тексту запроса и версиям прочитанных таблиц.
+    Если статистика базы говорит, что строк больше порога
+    COUNT_ESTIMATE_THRESHOLD, вместо COUNT(*) возвращается оценка.
+    """
+    if queryset.query.is_empty():
+        return 0
+    sql, tables = queryset_signature(queryset)
+    digest = hashlib.md5(
+        f"{sql}{get_table_versions(tables)}".encode()
+    ).hexdigest()
+    key = COUNT_KEY.format(digest)
+    count = cache.get(key)
+    if count is None:
+        count = estimate_count(queryset)
+        if count is None or count < settings.COUNT_ESTIMATE_THRESHOLD:
+            count = queryset.count()
+        cache.set(key, count, settings.COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class LocalCache:
+    """
+    LRU-кэш процесса с ограниченным временем жизни записей.
+
+    Записи живут не дольше `timeout` секунд, при переполнении `max_size`
+    вытесняются давно не использованные; при timeout=0 кэш выключен.
+    """
+
+    def __init__(self, timeout, max_size=10000):
+        self.timeout = timeout
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return default
+            self.entries.move_to_end(key)
+            return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def set(self, key, value):
+        if not self.timeout:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        with self.lock:
+            for key in [key for key in self.entries if predicate(key)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Родительские объекты вложенных маршрутов, существование которых
+# уже проверено: ключ — (модель, условия поиска).
+known_parents = LocalCache(settings.PARENT_CACHE_TIMEOUT)
+# Пользователи для аутентификации запросов на запись: ключ — id.
+cached_users = LocalCache(
+    settings.USER_CACHE_TIMEOUT, settings.USER_CACHE_SIZE
+)
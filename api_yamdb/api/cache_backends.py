@@ -0,0 +1,131 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+)
+"""
+# Просроченные записи удаляются примерно раз в CULL_EVERY записей.
+CULL_EVERY = 100
+
+
+class SQLiteCache(BaseCache):
+    """
+    Кэш в отдельном файле SQLite, общий для процессов одного сервера.
+
+    LOCATION — путь к файлу. В отличие от DatabaseCache не занимает
+    соединение с основной базой и не требует createcachetable.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = os.path.abspath(location)
+        self.local = threading.local()
+        self.writes = 0
+
+    @property
+    def db(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(SCHEMA)
+            self.local.db = db
+        return db
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self.db.execute(
+            "SELECT value FROM cache "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self.db.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires) "
+            "VALUES (?, ?, ?)",
+            (key, self.dump(value), self.get_backend_timeout(timeout)),
+        )
+        self.cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.db.execute(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (
+                key,
+                self.dump(value),
+                self.get_backend_timeout(timeout),
+                time.time(),
+            ),
+        )
+        self.cull()
+        return cursor.rowcount > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.db.execute(
+            "UPDATE cache SET expires = ? "
+            "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self.db.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return (
+            self.db.execute(
+                "SELECT 1 FROM cache "
+                "WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time()),
+            ).fetchone()
+            is not None
+        )
+
+    def clear(self):
+        self.db.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток, как и сам файл кэша.
+        pass
+
+    @staticmethod
+    def dump(value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def cull(self):
+        self.writes += 1
+        if self.writes % CULL_EVERY:
+            return
+        self.db.execute(
+            "DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?",
+            (time.time(),),
+        )
+        # Сверх MAX_ENTRIES удаляются записи, которые истекают раньше всех.
+        self.db.execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY expires IS NULL, expires "
+            "LIMIT max(0, (SELECT count(*) FROM cache) - ?))",
+            (self._max_entries,),
+        )
@@ -1,15 +1,51 @@
 from django_filters import rest_framework as filters
+from rest_framework.filters import SearchFilter
 
+from reviews.catalog import get_catalog
 from reviews.models import Title
+from reviews.utils import MAX_KEY_CHAR, make_name_key
+
+
+class NameKeySearchFilter(SearchFilter):
+    """Поиск по нормализованному ключу названия."""
+
+    def get_search_terms(self, request):
+        return [
+            make_name_key(term) for term in super().get_search_terms(request)
+        ]
 
 
 class TitleFilter(filters.FilterSet):
     """Фильтры произведений."""
 
-    genre = filters.CharFilter(field_name="genre__slug")
-    category = filters.CharFilter(field_name="category__slug")
-    name = filters.CharFilter(field_name="name", lookup_expr="icontains")
+    genre = filters.CharFilter(method="filter_genre")
+    category = filters.CharFilter(method="filter_category")
+    name = filters.CharFilter(method="filter_name")
+    name_prefix = filters.CharFilter(method="filter_name_prefix")
 
     class Meta:
         model = Title
-        fields = ("genre", "category", "name", "year")
+        fields = ("genre", "category", "name", "name_prefix", "year")
+
+    def filter_genre(self, queryset, name, value):
+        """Slug переводится в id по снимку, без JOIN таблицы жанров."""
+        genre = get_catalog(self.request).genres_by_slug.get(value)
+        if genre is None:
+            return queryset.none()
+        return queryset.filter(genre=genre.pk)
+
+    def filter_category(self, queryset, name, value):
+        category = get_catalog(self.request).categories_by_slug.get(value)
+        if category is None:
+            return queryset.none()
+        return queryset.filter(category_id=category.pk)
+
+    def filter_name(self, queryset, name, value):
+        return queryset.filter(name_key__contains=make_name_key(value))
+
+    def filter_name_prefix(self, queryset, name, value):
+        """Поиск по началу названия диапазоном по индексу name_key."""
+        key = make_name_key(value)
+        return queryset.filter(
+            name_key__gte=key, name_key__lt=key + MAX_KEY_CHAR
+        )
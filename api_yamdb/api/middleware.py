@@ -0,0 +1,89 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
+
+from .cache import PAGE_KEY, PAGES_VERSION_KEY, get_versions
+
+VARY_HEADERS = ("Accept", "Authorization")
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Кэш готовых страниц API для анонимных GET-запросов.
+
+    Запрос без заголовка Authorization к маршруту из PAGE_CACHE_TIMEOUTS
+    отдаётся из кэша без аутентификации, проверки прав и обращений к базе.
+    Ключ включает версию страниц из общего SHARED_CACHE: её меняют
+    сигналы записи в каталог и в имена пользователей в любом процессе.
+    Записи в обход сигналов (update(), массовый импорт) становятся видны
+    не позже времени жизни маршрута, которое задаёт и max-age для
+    клиентов. Запросы с токеном проходят мимо кэша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.timeouts = [
+            (re.compile(pattern), timeout)
+            for pattern, timeout in settings.PAGE_CACHE_TIMEOUTS.items()
+        ]
+
+    def get_timeout(self, request):
+        if request.method != "GET" or "Authorization" in request.headers:
+            return None
+        for pattern, timeout in self.timeouts:
+            if pattern.match(request.path_info):
+                return timeout
+        return None
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (name, sorted(values)) for name, values in request.GET.lists()
+        )
+        signature = (
+            f"{request.get_host()}{request.path}{params}"
+            f"{request.headers.get('Accept', '')}"
+            f"{get_versions([PAGES_VERSION_KEY])}"
+        )
+        return PAGE_KEY.format(hashlib.md5(signature.encode()).hexdigest())
+
+    def __call__(self, request):
+        if not request.path_info.startswith(settings.PAGE_CACHE_PREFIX):
+            return self.get_response(request)
+        timeout = self.get_timeout(request)
+        if not timeout:
+            response = self.get_response(request)
+            patch_vary_headers(response, VARY_HEADERS)
+            return response
+        key = self.get_cache_key(request)
+        page = cache.get(key)
+        if page is not None:
+            status, content, headers = page
+            response = HttpResponse(content, status=status)
+            for header, value in headers:
+                response[header] = value
+            return get_conditional_response(
+                request, etag=response.get("ETag"), response=response
+            )
+        response = self.get_response(request)
+        patch_vary_headers(response, VARY_HEADERS)
+        if (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        ):
+            patch_cache_control(response, public=True, max_age=timeout)
+            page = (
+                response.status_code,
+                response.content,
+                list(response.items()),
+            )
+            cache.set(key, page, timeout)
+        return response
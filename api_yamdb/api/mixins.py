@@ -1,17 +1,210 @@
-from rest_framework import filters, mixins, viewsets
-from rest_framework.pagination import LimitOffsetPagination
+import hashlib
+from functools import cached_property
 
+from django.conf import settings
+from django.http import Http404
+from django.utils.http import parse_etags
+from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.response import Response
+
+from .cache import (
+    RESPONSE_KEY,
+    get_or_compute,
+    get_table_versions,
+    known_parents,
+)
+from .filters import NameKeySearchFilter
+from .pagination import CachedCountPagination
 from .permissions import IsAdminOrReadOnly
+from reviews.catalog import get_catalog
+
+
+def request_signature(request) -> str:
+    """Адрес запроса с параметрами, не зависящий от их порядка."""
+    params = sorted(
+        (name, sorted(values)) for name, values in request.query_params.lists()
+    )
+    return f"{request.get_host()}{request.path}{params}"
+
+
+class VersionedMixin:
+    """
+    Версии данных, от которых зависит ответ представления.
+
+    По умолчанию — версия таблицы модели представления; представления,
+    зависящие от других данных, переопределяют get_cache_versions().
+    """
+
+    def get_cache_versions(self) -> tuple:
+        return get_table_versions([self.get_queryset().model._meta.db_table])
+
+    @cached_property
+    def cache_versions(self) -> tuple:
+        return self.get_cache_versions()
+
+
+class NotModified(Exception):
+    """Версия данных совпала с If-None-Match."""
+
+
+class ConditionalGetMixin(VersionedMixin):
+    """
+    Условные GET для list и retrieve.
+
+    ETag строится из адреса, формата ответа и версий данных, без
+    рендеринга тела. Совпавший If-None-Match получает 304 сразу после
+    проверки прав — до выборки и сериализации.
+    """
+
+    conditional_actions = ("list", "retrieve")
+    etag = None
+
+    def get_etag(self, request):
+        if (
+            request.method not in ("GET", "HEAD")
+            or self.action not in self.conditional_actions
+        ):
+            return None
+        signature = (
+            f"{request_signature(request)}"
+            f"{request.accepted_renderer.format}{self.cache_versions}"
+        )
+        return f'"{hashlib.md5(signature.encode()).hexdigest()}"'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.get_etag(request)
+        if self.etag is None:
+            return
+        # Слабое сравнение: W/ у клиентских ETag не учитывается.
+        etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if self.etag in (etag.removeprefix("W/") for etag in etags):
+            raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.etag and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response["ETag"] = self.etag
+        return response
 
 
 class ListCreateDestroyViewSet(
+    ConditionalGetMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.DestroyModelMixin,
     viewsets.GenericViewSet,
 ):
-    pagination_class = LimitOffsetPagination
-    filter_backends = (filters.SearchFilter,)
+    pagination_class = CachedCountPagination
+    filter_backends = (NameKeySearchFilter,)
     permission_classes = (IsAdminOrReadOnly,)
-    search_fields = ("name",)
+    search_fields = ("name_key",)
     lookup_field = "slug"
+    # Атрибут снимка справочников, из которого отдаётся список.
+    catalog_attr = None
+
+    def get_cache_versions(self):
+        return super().get_cache_versions() + (
+            get_catalog(self.request).version,
+        )
+
+    def filter_queryset(self, queryset):
+        if self.action != "list" or self.catalog_attr is None:
+            return super().filter_queryset(queryset)
+        terms = NameKeySearchFilter().get_search_terms(self.request)
+        return [
+            item
+            for item in getattr(get_catalog(self.request), self.catalog_attr)
+            if all(term in item.name_key for term in terms)
+        ]
+
+
+class NestedParentMixin:
+    """
+    Проверка родительского объекта вложенного маршрута.
+
+    Цепочка `title_id`/`review_id` проверяется одним запросом и не
+    больше одного раза за запрос к API. Для детальных маршрутов отдельная
+    проверка не нужна: выборка объекта уже фильтруется по родителю.
+    Для чтения списков существование родителя недолго помнится
+    в кэше процесса (PARENT_CACHE_TIMEOUT).
+    """
+
+    parent_model = None
+    # Поле родительской модели -> имя аргумента маршрута.
+    parent_lookups = {}
+
+    def get_parent_filter(self):
+        return {
+            field: int(self.kwargs[kwarg])
+            for field, kwarg in self.parent_lookups.items()
+        }
+
+    def check_parent(self):
+        if getattr(self, "_parent_checked", False):
+            return
+        parent_filter = self.get_parent_filter()
+        key = (
+            self.parent_model._meta.label,
+            tuple(sorted(parent_filter.items())),
+        )
+        cached = (
+            self.request.method in permissions.SAFE_METHODS
+            and key in known_parents
+        )
+        if not cached:
+            if not self.parent_model.objects.filter(**parent_filter).exists():
+                raise Http404
+            known_parents.set(key, True)
+        self._parent_checked = True
+
+
+class ResponseCacheMixin(VersionedMixin):
+    """
+    Кэш ответов list и retrieve.
+
+    Ключ строится из адреса, нормализованных параметров запроса
+    и версий данных из get_cache_versions(): запись в связанные таблицы
+    или объект меняет версию, и старые ответы больше не читаются.
+    """
+
+    response_cache_timeout = settings.RESPONSE_CACHE_TIMEOUT
+
+    def get_response_cache_key(self, request):
+        signature = f"{request_signature(request)}{self.cache_versions}"
+        return RESPONSE_KEY.format(hashlib.md5(signature.encode()).hexdigest())
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        computed = []
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            computed.append(response)
+            if response.status_code != status.HTTP_200_OK:
+                return None
+            return response.data
+
+        data = get_or_compute(
+            self.get_response_cache_key(request),
+            compute,
+            self.response_cache_timeout,
+        )
+        return computed[0] if computed else Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,276 @@
+import json
+from abc import ABC, abstractmethod
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    LimitOffsetPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .cache import get_cached_count
+
+FALSE_VALUES = ("0", "false", "no", "off")
+
+
+class CountOptionalMixin:
+    """
+    Управление подсчётом `count` в ответе.
+
+    `?count=false` отключает подсчёт: наличие следующей страницы
+    определяется по одной лишней строке, а `count` в ответе равен null.
+    """
+
+    count_query_param = "count"
+
+    def count_requested(self, request):
+        value = request.query_params.get(self.count_query_param, "")
+        return value.lower() not in FALSE_VALUES
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if not self.with_count:
+            response.data["count"] = None
+        return response
+
+
+class CachedCountPagination(CountOptionalMixin, LimitOffsetPagination):
+    """LimitOffsetPagination с кэшируемым или оценочным `count`."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = self.count_requested(request)
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        # Нижняя граница числа строк: её достаточно для ссылки `next`.
+        self.count = self.offset + len(results)
+        return results[: self.limit]
+
+    def get_count(self, queryset):
+        if isinstance(queryset, list):
+            return len(queryset)
+        return get_cached_count(queryset)
+
+
+class CachedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return get_cached_count(self.object_list)
+
+
+class CachedCountPageNumberPagination(
+    CountOptionalMixin, PageNumberPagination
+):
+    """PageNumberPagination с кэшируемым или оценочным `count`."""
+
+    django_paginator_class = CachedCountPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.with_count = self.count_requested(request)
+        if self.with_count:
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            number = int(page_number)
+        except ValueError:
+            number = 0
+        offset = (number - 1) * page_size
+        results = []
+        if number > 0:
+            results = list(queryset[offset:offset + page_size + 1])
+        if not results and number != 1:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message="Неверная страница."
+                )
+            )
+        paginator = Paginator((), page_size)
+        # Нижняя граница числа строк: её достаточно для ссылки `next`.
+        paginator.count = offset + len(results)
+        self.page = Page(results[:page_size], number, paginator)
+        self.request = request
+        return list(self.page)
+
+
+class KeysetMixin(ABC):
+    """
+    Дополнительный режим курсора для пагинации.
+
+    Режим курсора включается параметром `cursor` (для первой страницы —
+    пустым: `?cursor=`). Страница выбирается условием по ключу сортировки
+    вместо OFFSET и без COUNT, поэтому любая страница стоит как первая.
+    Без параметра `cursor` поведение совпадает с базовой пагинацией.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+    # По умолчанию берётся Meta.ordering модели, дополненный первичным ключом.
+    ordering = None
+
+    @abstractmethod
+    def get_keyset_limit(self, request):
+        """Размер страницы курсора в терминах базовой пагинации."""
+
+    @abstractmethod
+    def get_keyset_url(self, url):
+        """Ссылка на страницу курсора без параметров базовой пагинации."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.keyset = False
+            return super().paginate_queryset(queryset, request, view)
+
+        self.keyset = True
+        self.request = request
+        self.limit = self.get_keyset_limit(request)
+        if self.limit is None:
+            return None
+
+        self.fields = self.get_keyset_ordering(queryset)
+        self.model_fields = [
+            queryset.model._meta.get_field(field.lstrip("-"))
+            for field in self.fields
+        ]
+        reverse, position = self.decode_cursor(request)
+
+        ordering = self.fields
+        if reverse:
+            ordering = [self._invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(ordering, position)
+            )
+
+        results = list(queryset[: self.limit + 1])
+        has_more = len(results) > self.limit
+        results = results[: self.limit]
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.keyset_page = results
+        return results
+
+    def get_keyset_ordering(self, queryset):
+        ordering = list(self.ordering or queryset.model._meta.ordering)
+        pk_name = queryset.model._meta.pk.name
+        if not ordering or ordering[-1].lstrip("-") not in ("pk", pk_name):
+            prefix = "-" if ordering and ordering[-1].startswith("-") else ""
+            ordering.append(prefix + pk_name)
+        return ordering
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Условие «строго после позиции» для составного ключа сортировки.
+
+        Первое поле дополнительно ограничено нестрогим неравенством, чтобы
+        база могла начать просмотр индекса сразу с нужного места.
+        """
+        bounds = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            bounds |= Q(**equal, **{f"{name}__{lookup}": value})
+            equal[name] = value
+        first = ordering[0]
+        lookup = "lte" if first.startswith("-") else "gte"
+        return Q(**{f"{first.lstrip('-')}__{lookup}": position[0]}) & bounds
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            reverse, *values = json.loads(urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.model_fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.model_fields, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    def encode_cursor(self, item, reverse):
+        values = [field.value_to_string(item) for field in self.model_fields]
+        encoded = urlsafe_b64encode(
+            json.dumps([int(reverse), *values]).encode()
+        )
+        url = self.get_keyset_url(self.request.build_absolute_uri())
+        return replace_query_param(
+            url, self.cursor_query_param, encoded.decode()
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.keyset_page:
+            return None
+        return self.encode_cursor(self.keyset_page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.keyset_page:
+            return None
+        return self.encode_cursor(self.keyset_page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith("-") else "-" + field
+
+
+class KeysetPagination(KeysetMixin, CachedCountPagination):
+    """Пагинация limit/offset с режимом курсора."""
+
+    def get_keyset_limit(self, request):
+        return self.get_limit(request)
+
+    def get_keyset_url(self, url):
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.limit_query_param, self.limit)
+
+
+class KeysetPageNumberPagination(
+    KeysetMixin, CachedCountPageNumberPagination
+):
+    """Пагинация по номеру страницы с режимом курсора."""
+
+    def get_keyset_limit(self, request):
+        return self.get_page_size(request)
+
+    def get_keyset_url(self, url):
+        return remove_query_param(url, self.page_query_param)
@@ -1,3 +1,4 @@
+from django.contrib.auth import get_user_model
 from rest_framework import permissions
 
 
@@ -20,6 +21,16 @@ class IsAuthorOrModeratorOrAdminOrReadOnly(permissions.BasePermission):
 
 
 class IsAdminUser(permissions.BasePermission):
+    """
+    Доступ только администраторам.
+
+    Роль проверяется по базе, а не по токену или кэшу процесса:
+    разжалованный администратор сразу теряет доступ к данным
+    пользователей.
+    """
 
     def has_permission(self, request, view):
-        return getattr(request.user, "is_admin", False)
+        if not request.user.is_authenticated:
+            return False
+        user = get_user_model().objects.filter(pk=request.user.pk).first()
+        return bool(user and user.is_admin)
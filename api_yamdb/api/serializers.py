@@ -1,11 +1,16 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.settings import api_settings
 
+from .authentication import RoleAccessToken
+from .cache import cached_users
 from .utils import send_otp_code
+from reviews.catalog import get_catalog
 from reviews.models import (
     Category,
     Comment,
@@ -13,8 +18,10 @@ from reviews.models import (
     Review,
     Title,
 )
+from reviews.search import SEARCH_KINDS
 from users.constants import USERNAME_MAX_LENGTH
 from users.models import OtpCode
+from users.otp import check_code, consume_code
 from users.validators import validate_username
 
 User = get_user_model()
@@ -36,29 +43,63 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ("name", "slug")
 
 
+class CatalogSlugField(serializers.SlugRelatedField):
+    """Жанр или категория по slug из снимка справочников, без запроса."""
+
+    def __init__(self, catalog_attr, **kwargs):
+        self.catalog_attr = catalog_attr
+        super().__init__(slug_field="slug", **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail("invalid")
+        catalog = get_catalog(self.context.get("request"))
+        item = getattr(catalog, f"{self.catalog_attr}_by_slug").get(data)
+        if item is None:
+            self.fail("does_not_exist", slug_name=self.slug_field, value=data)
+        return item
+
+
+class CatalogRelatedField(serializers.RelatedField):
+    """Жанр или категория по id из снимка справочников."""
+
+    def __init__(self, catalog_attr, **kwargs):
+        self.catalog_attr = catalog_attr
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def use_pk_only_optimization(self):
+        return True
+
+    def to_representation(self, value):
+        request = self.context.get("request")
+        attr = f"{self.catalog_attr}_by_id"
+        item = getattr(get_catalog(request), attr).get(value.pk)
+        if item is None:
+            # Объект записан после того, как снимок сверили в этом запросе.
+            item = getattr(get_catalog(request, reload=True), attr)[value.pk]
+        return {"name": item.name, "slug": item.slug}
+
+
 class TitleWriteSerializer(serializers.ModelSerializer):
     """Сериализатор произведений."""
 
-    genre = serializers.SlugRelatedField(
+    genre = CatalogSlugField(
+        "genres",
         allow_null=False,
         allow_empty=False,
         required=True,
         many=True,
-        slug_field="slug",
         queryset=Genre.objects.all(),
     )
-    category = serializers.SlugRelatedField(
+    category = CatalogSlugField(
+        "categories",
         required=True,
         queryset=Category.objects.all(),
-        slug_field="slug",
     )
 
     def to_representation(self, instance):
-        instance = Title.objects.annotate(rating=Avg("reviews__score")).get(
-            id=instance.id
-        )
-        serializer = TitleViewSerializer(instance)
-        return serializer.data
+        return TitleViewSerializer(instance, context=self.context).data
 
     class Meta:
         model = Title
@@ -75,8 +116,8 @@ class TitleWriteSerializer(serializers.ModelSerializer):
 class TitleViewSerializer(serializers.ModelSerializer):
     """Сериализатор произведений."""
 
-    genre = GenreSerializer(many=True, required=True)
-    category = CategorySerializer(required=True)
+    genre = CatalogRelatedField("genres", many=True)
+    category = CatalogRelatedField("categories")
     rating = serializers.ReadOnlyField(
         default=None,
     )
@@ -111,16 +152,27 @@ class ReviewSerializer(serializers.ModelSerializer):
         read_only=True,
     )
 
-    def validate(self, attrs):
-        """Один отзыв на произведение от одного пользователя."""
-        request = self.context.get("request")
-        view = self.context.get("view")
-        if request and view and request.method == "POST":
-            title_id = view.kwargs.get("title_id")
-            user = request.user
-            if Review.objects.filter(title_id=title_id, author=user).exists():
-                raise serializers.ValidationError("Вы уже писали отзыв!")
-        return attrs
+    def create(self, validated_data):
+        """
+        Один отзыв на произведение от одного пользователя.
+
+        Повтор ловит ограничение unique_review_per_title, поэтому отдельной
+        проверки перед вставкой нет и параллельные запросы не дают 500.
+        Остальные нарушения целостности (например, произведение удалено
+        параллельно) пробрасываются дальше.
+        """
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            if not Review.objects.filter(
+                title_id=validated_data["title_id"],
+                author=validated_data["author"],
+            ).exists():
+                raise
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ["Вы уже писали отзыв!"]}
+            )
 
     class Meta:
         model = Review
@@ -140,6 +192,21 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ("id", "text", "author", "pub_date")
 
 
+class SearchQuerySerializer(serializers.Serializer):
+    """Параметры полнотекстового поиска."""
+
+    q = serializers.CharField(required=True, max_length=256)
+    type = serializers.ChoiceField(
+        choices=SEARCH_KINDS, required=False, default=None
+    )
+    limit = serializers.IntegerField(
+        required=False, default=10, min_value=1, max_value=100
+    )
+    offset = serializers.IntegerField(
+        required=False, default=0, min_value=0
+    )
+
+
 class AdminUserSerializer(serializers.ModelSerializer):
     """
     Сериализатор для админов с выбором роли
@@ -173,23 +240,37 @@ class UserSerializer(serializers.Serializer):
     )
 
     def create(self, validated_data):
-        username = validated_data.get("username")
-        email = validated_data.get("email")
-        user, created = User.objects.get_or_create(
-            username=username, email=email
-        )
-        send_otp_code(user.email)
+        user = self.user
+        if user is None:
+            try:
+                with transaction.atomic():
+                    user = User.objects.create(**validated_data)
+            except IntegrityError:
+                # Параллельная регистрация с тем же username или email.
+                user = self.resolve(**validated_data)
+                if user is None:
+                    raise
+        send_otp_code(user)
         return user
 
-    def validate(self, attrs):
-        email = attrs.get("email")
-        username = attrs.get("username")
-
-        user_by_username = User.objects.filter(username=username).first()
-        user_by_email = User.objects.filter(email=email).first()
+    def resolve(self, username, email):
+        """
+        Пользователь с этими username и email, если он уже есть.
+
+        Обе пары проверяются одним запросом; ValidationError, если
+        username и email заняты разными пользователями.
+        """
+        user_by_username = user_by_email = None
+        for user in User.objects.filter(
+            Q(username=username) | Q(email=email)
+        )[:2]:
+            if user.username == username:
+                user_by_username = user
+            if user.email == email:
+                user_by_email = user
 
         if user_by_username == user_by_email:
-            return attrs
+            return user_by_username
         if user_by_username and user_by_email:
             raise serializers.ValidationError(
                 {
@@ -203,10 +284,13 @@ class UserSerializer(serializers.Serializer):
                 {"username": ["Введённый username уже занят."]}
             )
 
-        if user_by_email:
-            raise serializers.ValidationError(
-                {"email": ["Введённый email уже занят."]}
-            )
+        raise serializers.ValidationError(
+            {"email": ["Введённый email уже занят."]}
+        )
+
+    def validate(self, attrs):
+        self.user = self.resolve(attrs["username"], attrs["email"])
+        return attrs
 
 
 class NewTokenObtainPairSerializer(serializers.Serializer):
@@ -223,14 +307,21 @@ class NewTokenObtainPairSerializer(serializers.Serializer):
 
         user = get_object_or_404(User, username=username)
 
-        if not OtpCode.objects.filter(
-            email=user.email,
-            code=confirmation_code,
-            expired__gt=timezone.now(),
-        ).exists():
+        if settings.OTP_STATELESS:
+            valid = check_code(user, confirmation_code) and consume_code(user)
+            if valid:
+                # Копия с прежним счётчиком не должна пережить погашение.
+                cached_users.delete(user.pk)
+        else:
+            valid = OtpCode.objects.filter(
+                email=user.email,
+                code=confirmation_code,
+                expired__gt=timezone.now(),
+            ).exists()
+        if not valid:
             raise serializers.ValidationError(
                 "Неверный или просроченный код подтверждения."
             )
 
-        access_token = AccessToken.for_user(user)
+        access_token = RoleAccessToken.for_user(user)
         return {"token": str(access_token)}
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .cache import (
+    AUTHORS_VERSION_KEY,
+    PAGES_VERSION_KEY,
+    bump_table_version,
+    bump_version,
+    cached_users,
+    entity_version_key,
+    known_parents,
+)
+from reviews.catalog import bump_catalog_version
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import shift_rating
+
+TRACKED_APPS = ("reviews", "users")
+# Приложения, данные которых видны на страницах для анонимов.
+PAGE_APPS = ("reviews",)
+
+
+def bump_after_commit(bump, *args):
+    # До фиксации транзакции параллельный запрос прочитал бы старые данные
+    # и закэшировал их под новой версией.
+    transaction.on_commit(lambda: bump(*args))
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_model_version(sender, **kwargs):
+    if sender._meta.app_label in TRACKED_APPS:
+        bump_after_commit(bump_table_version, sender._meta.db_table)
+    if sender._meta.app_label in PAGE_APPS:
+        bump_after_commit(bump_version, PAGES_VERSION_KEY)
+
+
+@receiver(m2m_changed)
+def bump_relation_version(sender, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if sender._meta.app_label in TRACKED_APPS:
+        bump_after_commit(bump_table_version, sender._meta.db_table)
+    if sender._meta.app_label in PAGE_APPS:
+        bump_after_commit(bump_version, PAGES_VERSION_KEY)
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_title_version(sender, instance, **kwargs):
+    title_id = instance.pk if sender is Title else instance.title_id
+    bump_after_commit(bump_version, entity_version_key(Title, title_id))
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def bump_title_genres_version(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not action.startswith("post_"):
+        return
+    title_ids = (pk_set or ()) if reverse else (instance.pk,)
+    for title_id in title_ids:
+        bump_after_commit(bump_version, entity_version_key(Title, title_id))
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog(sender, **kwargs):
+    # Версия в базе меняется в транзакции записи: другой процесс увидит
+    # её одновременно с самими данными.
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_review_version(sender, instance, **kwargs):
+    # Версия отзыва покрывает и сам отзыв, и список его комментариев.
+    review_id = instance.pk if sender is Review else instance.review_id
+    bump_after_commit(bump_version, entity_version_key(Review, review_id))
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    # Прежние произведение и оценка нужны, чтобы сдвинуть агрегаты
+    # рейтинга на разницу; в транзакции строка блокируется, и
+    # параллельное изменение того же отзыва дождётся фиксации.
+    instance._stored_rating = None
+    if raw or instance._state.adding:
+        return
+    reviews = Review.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        reviews = reviews.select_for_update()
+    instance._stored_rating = reviews.values_list("title_id", "score").first()
+
+
+@receiver(post_save, sender=Review)
+def shift_saved_review_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    stored = getattr(instance, "_stored_rating", None)
+    if stored is None:
+        shift_rating(instance.title_id, score=instance.score, count=1)
+        return
+    title_id, score = stored
+    if title_id == instance.title_id:
+        shift_rating(title_id, score=instance.score - score)
+        return
+    shift_rating(title_id, score=-score, count=-1)
+    shift_rating(instance.title_id, score=instance.score, count=1)
+
+
+@receiver(post_delete, sender=Review)
+def shift_deleted_review_rating(sender, instance, **kwargs):
+    # Срабатывает и при каскадном удалении отзывов вместе с автором.
+    shift_rating(instance.title_id, score=-instance.score, count=-1)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def bump_authors_version(sender, created=False, update_fields=None, **kwargs):
+    # Новый пользователь ещё ничего не писал; сохранение отдельных полей
+    # меняет имя автора, только если среди них есть username.
+    if created or (update_fields and "username" not in update_fields):
+        return
+    bump_after_commit(bump_version, AUTHORS_VERSION_KEY)
+    bump_after_commit(bump_version, PAGES_VERSION_KEY)
+
+
+@receiver(post_delete)
+def forget_known_parent(sender, **kwargs):
+    # Удалённое произведение тянет за собой отзывы, поэтому из кэша
+    # уходят все ключи модели.
+    if sender._meta.app_label == "reviews":
+        label = sender._meta.label
+        known_parents.delete_matching(lambda key: key[0] == label)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_cached_user(sender, instance, **kwargs):
+    # Смена роли или блокировка в этом процессе видна сразу,
+    # в остальных — не позже USER_CACHE_TIMEOUT.
+    cached_users.delete(instance.pk)
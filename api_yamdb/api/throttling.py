@@ -0,0 +1,93 @@
+import hashlib
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Ограничение частоты запросов по алгоритму «ведро с токенами».
+
+    Скорость `N/период` из DEFAULT_THROTTLE_RATES означает ведро на N
+    запросов, которое равномерно наполняется за период. В кэше хранится
+    только пара (токены, время), а не история запросов. Кэш выбирается
+    настройкой THROTTLE_CACHE.
+    """
+
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_cache_keys(self, request, view):
+        key = self.get_cache_key(request, view)
+        return [] if key is None else [key]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        keys = self.get_cache_keys(request, view)
+        if not keys:
+            return True
+        now = self.timer()
+        refill = self.num_requests / self.duration
+        buckets = self.cache.get_many(keys)
+        tokens = {}
+        for key in keys:
+            level, updated = buckets.get(key, (self.num_requests, now))
+            tokens[key] = min(
+                self.num_requests, level + (now - updated) * refill
+            )
+        lowest = min(tokens.values())
+        if lowest < 1:
+            self.wait_time = (1 - lowest) / refill
+            return False
+        # Полное ведро не отличается от отсутствующего: запись живёт,
+        # пока ведро не наполнится.
+        self.cache.set_many(
+            {key: (value - 1, now) for key, value in tokens.items()},
+            self.duration,
+        )
+        return True
+
+    def wait(self):
+        return self.wait_time
+
+
+class AuthIPThrottle(TokenBucketThrottle):
+    """Ограничение запросов к /auth/ с одного IP-адреса."""
+
+    scope = "auth"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class AuthIdentityThrottle(TokenBucketThrottle):
+    """Ограничение запросов к /auth/ для одного username и одного email."""
+
+    scope = "auth_identity"
+    fields = ("username", "email")
+
+    def get_cache_keys(self, request, view):
+        data = request.data if isinstance(request.data, Mapping) else {}
+        keys = []
+        for field in self.fields:
+            value = data.get(field)
+            if isinstance(value, str) and value.strip():
+                # Хэш вместо значения: ключ не длиннее лимита memcached
+                # и без недопустимых в нём символов.
+                digest = hashlib.sha256(
+                    value.strip().lower().encode()
+                ).hexdigest()
+                ident = f"{field}:{digest}"
+                keys.append(
+                    self.cache_format % {"scope": self.scope, "ident": ident}
+                )
+        return keys
@@ -1,14 +1,15 @@
 from django.urls import include, path
 from rest_framework import routers
-from rest_framework_simplejwt.views import TokenObtainPairView
 
 from api.views import (
     CategoryViewSet,
     CommentViewSet,
     GenreViewSet,
     ReviewViewSet,
+    SearchView,
     SignupView,
     TitleViewSet,
+    TokenView,
     UserViewSet,
 )
 
@@ -28,6 +29,7 @@ router.register("titles", TitleViewSet, basename="titles"),
 
 urlpatterns = [
     path("v1/", include(router.urls)),
+    path("v1/search/", SearchView.as_view()),
     path("v1/auth/signup/", SignupView.as_view()),
-    path("v1/auth/token/", TokenObtainPairView.as_view()),
+    path("v1/auth/token/", TokenView.as_view()),
 ]
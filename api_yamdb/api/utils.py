@@ -1,47 +1,55 @@
 import random
 import string
 
-from django.core.mail import send_mail
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 
 from users.models import OtpCode
+from users.otp import make_code
+from users.outbox import enqueue_email
 
 
-def send_otp_code(email: str) -> None:
+def get_table_code(email: str) -> str:
+    """Код из таблицы OtpCode: действующий или новый на 60 минут."""
+    datetime_now = timezone.datetime.now()
+    expired = datetime_now + timezone.timedelta(minutes=60)
+    if OtpCode.objects.filter(email=email, expired__gt=datetime_now).exists():
+        code = (
+            OtpCode.objects.filter(email=email, expired__gt=datetime_now)
+            .first()
+            .code
+        )
+    else:
+        code = "".join(random.choices(string.digits, k=6))
+    OtpCode.objects.update_or_create(
+        email=email,
+        defaults={
+            "code": code,
+            "created_at": datetime_now,
+            "expired": expired,
+        },
+    )
+    return code
+
+
+def send_otp_code(user) -> None:
     """
     Функция отправки единоразового 6-значного кода на почту.
     Токен доступен 10 минут, после этого направляется новый код.
     """
-    try:
-        datetime_now = timezone.datetime.now()
-        expired = datetime_now + timezone.timedelta(minutes=60)
-        if OtpCode.objects.filter(
-            email=email, expired__gt=datetime_now
-        ).exists():
-            code = (
-                OtpCode.objects.filter(email=email, expired__gt=datetime_now)
-                .first()
-                .code
-            )
+    # Письмо уходит в очередь вместе с кодом, отправляет его send_emails.
+    with transaction.atomic():
+        if settings.OTP_STATELESS:
+            code = make_code(user)
         else:
-            code = "".join(random.choices(string.digits, k=6))
-        send_mail(
+            code = get_table_code(user.email)
+        enqueue_email(
             subject="Ваш код для получения токена",
-            message=(
+            body=(
                 f"Ваш код для получения токена: {code}\n"
                 "Он будет доступен 10 минут."
             ),
             from_email="myemail@gmail.com",
-            recipient_list=[email],
-            fail_silently=False,
-        )
-        OtpCode.objects.update_or_create(
-            email=email,
-            defaults={
-                "code": code,
-                "created_at": datetime_now,
-                "expired": expired,
-            },
+            recipient=user.email,
         )
-    except Exception as e:
-        print(f"Возникла ошибка при отправке:\n{e}")
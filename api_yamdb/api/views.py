@@ -1,25 +1,45 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import SearchFilter
 from rest_framework.generics import CreateAPIView
-from rest_framework.pagination import (
-    LimitOffsetPagination,
-    PageNumberPagination,
-)
 from rest_framework.permissions import (
     AllowAny,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
+from rest_framework_simplejwt.views import TokenObtainPairView
 
+from .cache import (
+    AUTHORS_VERSION_KEY,
+    PAGES_VERSION_KEY,
+    TABLE_VERSION_KEY,
+    bump_table_version,
+    bump_version,
+    entity_version_key,
+    get_table_versions,
+    get_versions,
+)
 from .filters import TitleFilter
-from .mixins import ListCreateDestroyViewSet
+from .mixins import (
+    ConditionalGetMixin,
+    ListCreateDestroyViewSet,
+    NestedParentMixin,
+    ResponseCacheMixin,
+)
+from .pagination import (
+    CachedCountPageNumberPagination,
+    KeysetPageNumberPagination,
+    KeysetPagination,
+)
 from .permissions import (
     IsAdminOrReadOnly,
     IsAdminUser,
@@ -31,18 +51,24 @@ from .serializers import (
     CommentSerializer,
     GenreSerializer,
     ReviewSerializer,
+    SearchQuerySerializer,
     TitleViewSerializer,
     TitleWriteSerializer,
     UserSerializer,
 )
-from reviews.models import Category, Genre, Review, Title
+from .throttling import AuthIdentityThrottle, AuthIPThrottle
+from reviews.catalog import get_catalog
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import rebuild_ratings
+from reviews.search import SEARCH_KINDS, search, search_supported
 
 User = get_user_model()
 
 
-class ReviewViewSet(ModelViewSet):
+class ReviewViewSet(ConditionalGetMixin, NestedParentMixin, ModelViewSet):
     """Ссылка: "/api/v1/titles/<title_id>/reviews/"."""
 
+    pagination_class = KeysetPageNumberPagination
     serializer_class = ReviewSerializer
     permission_classes = (
         IsAuthenticatedOrReadOnly,
@@ -50,17 +76,85 @@ class ReviewViewSet(ModelViewSet):
     )
     http_method_names = ["get", "post", "patch", "delete", "head", "options"]
 
-    def get_title(self):
-        return get_object_or_404(Title, pk=self.kwargs.get("title_id"))
+    parent_model = Title
+    parent_lookups = {"pk": "title_id"}
 
     def get_queryset(self):
-        return self.get_title().reviews.order_by("-pub_date")
+        if not self.detail:
+            self.check_parent()
+        return (
+            Review.objects.filter(title_id=self.kwargs["title_id"])
+            .select_related("author")
+            .order_by("-pub_date")
+        )
+
+    def get_cache_versions(self):
+        # Список меняется вместе с версией произведения, отзыв — со своей.
+        if self.detail:
+            key = entity_version_key(Review, self.kwargs["pk"])
+        else:
+            key = entity_version_key(Title, self.kwargs["title_id"])
+        return get_versions([key, AUTHORS_VERSION_KEY])
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, title=self.get_title())
+        # Агрегаты рейтинга сдвигают сигналы отзыва в той же транзакции.
+        self.check_parent()
+        serializer.save(
+            author=self.request.user, title_id=self.kwargs["title_id"]
+        )
+
+    @action(
+        detail=False,
+        methods=["put"],
+        url_path="mine",
+        url_name="mine",
+        permission_classes=[IsAuthenticated],
+        http_method_names=["put", "options"],
+    )
+    def mine(self, request, *args, **kwargs):
+        """
+        Создание или замена отзыва текущего пользователя.
 
+        Отзыв записывается одним INSERT ... ON CONFLICT DO UPDATE,
+        после чего рейтинг произведения пересчитывается одним UPDATE.
+        """
+        self.check_parent()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        review = Review(
+            title_id=self.kwargs["title_id"],
+            author=request.user,
+            **serializer.validated_data,
+        )
+        with transaction.atomic():
+            Review.objects.bulk_create(
+                [review],
+                update_conflicts=True,
+                unique_fields=["title", "author"],
+                update_fields=["text", "score", "pub_date"],
+            )
+            rebuild_ratings(Title.objects.filter(pk=review.title_id))
+        # bulk_create не отправляет post_save.
+        bump_table_version(Review._meta.db_table)
+        bump_version(entity_version_key(Title, review.title_id))
+        bump_version(entity_version_key(Review, review.pk))
+        bump_version(PAGES_VERSION_KEY)
+        return Response(self.get_serializer(review).data)
 
-class CommentViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+
+
+class CommentViewSet(
+    ConditionalGetMixin, NestedParentMixin, viewsets.ModelViewSet
+):
+    pagination_class = KeysetPageNumberPagination
     serializer_class = CommentSerializer
     permission_classes = (
         IsAuthenticatedOrReadOnly,
@@ -68,28 +162,50 @@ class CommentViewSet(viewsets.ModelViewSet):
     )
     http_method_names = ["get", "post", "patch", "delete", "head", "options"]
 
-    def get_review(self):
-        return get_object_or_404(
-            Review,
-            pk=self.kwargs.get("review_id"),
-            title_id=self.kwargs.get("title_id"),
-        )
+    parent_model = Review
+    parent_lookups = {"pk": "review_id", "title_id": "title_id"}
 
     def get_queryset(self):
-        return self.get_review().comments.all().order_by("pub_date")
+        if not self.detail:
+            self.check_parent()
+        return (
+            Comment.objects.filter(
+                review_id=self.kwargs["review_id"],
+                review__title_id=self.kwargs["title_id"],
+            )
+            .select_related("author")
+            .order_by("pub_date")
+        )
+
+    def get_cache_versions(self):
+        return get_versions(
+            [
+                entity_version_key(Review, self.kwargs["review_id"]),
+                AUTHORS_VERSION_KEY,
+            ]
+        )
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user, review=self.get_review())
+        self.check_parent()
+        serializer.save(
+            author=self.request.user, review_id=self.kwargs["review_id"]
+        )
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(
+    ConditionalGetMixin, ResponseCacheMixin, viewsets.ModelViewSet
+):
     """Вьюсет произведений."""
 
-    pagination_class = LimitOffsetPagination
+    pagination_class = KeysetPagination
     permission_classes = (IsAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
-    queryset = Title.objects.annotate(rating=Avg("reviews__score"))
+    # Жанры и категория выводятся из снимка справочников: из базы
+    # читаются только их id.
+    queryset = Title.objects.prefetch_related(
+        Prefetch("genre", queryset=Genre.objects.only("pk"))
+    )
     http_method_names = ["get", "post", "patch", "delete", "head", "options"]
 
     def get_serializer_class(self):
@@ -97,12 +213,37 @@ class TitleViewSet(viewsets.ModelViewSet):
             return TitleWriteSerializer
         return TitleViewSerializer
 
+    def get_cache_versions(self):
+        # Рейтинг зависит от отзывов, карточка — от жанров и категорий,
+        # которые выводятся из снимка справочников.
+        if self.detail:
+            versions = get_versions(
+                [
+                    entity_version_key(Title, self.kwargs["pk"]),
+                    TABLE_VERSION_KEY.format(Genre._meta.db_table),
+                    TABLE_VERSION_KEY.format(Category._meta.db_table),
+                ]
+            )
+        else:
+            versions = get_table_versions(
+                model._meta.db_table
+                for model in (
+                    Title,
+                    Title.genre.through,
+                    Genre,
+                    Category,
+                    Review,
+                )
+            )
+        return versions + (get_catalog(self.request).version,)
+
 
 class GenreViewSet(ListCreateDestroyViewSet):
     """Вьюсет жанров."""
 
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    catalog_attr = "genres"
 
 
 class CategoryViewSet(ListCreateDestroyViewSet):
@@ -110,6 +251,7 @@ class CategoryViewSet(ListCreateDestroyViewSet):
 
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    catalog_attr = "categories"
 
 
 class UserViewSet(ModelViewSet):
@@ -117,7 +259,7 @@ class UserViewSet(ModelViewSet):
     filter_backends = (SearchFilter,)
     search_fields = ("username",)
     lookup_field = "username"
-    pagination_class = PageNumberPagination
+    pagination_class = CachedCountPageNumberPagination
     serializer_class = AdminUserSerializer
     permission_classes = (IsAdminUser,)
     http_method_names = ["get", "post", "patch", "delete"]
@@ -132,13 +274,24 @@ class UserViewSet(ModelViewSet):
     )
     def me(self, request, *args, **kwargs):
         if request.method == "PATCH":
-            serializer = self.get_serializer(
-                request.user, data=request.data, partial=True
-            )
-            serializer.is_valid(raise_exception=True)
-            serializer.save(role=request.user.role)
+            # request.user может быть копией из кэша процесса: сохранять её
+            # значит вернуть устаревшие роль и otp_nonce. Профиль и роль
+            # берутся из базы.
+            with transaction.atomic():
+                user = get_object_or_404(
+                    User.objects.select_for_update(), pk=request.user.pk
+                )
+                serializer = self.get_serializer(
+                    user, data=request.data, partial=True
+                )
+                serializer.is_valid(raise_exception=True)
+                serializer.save(role=user.role)
             return Response(serializer.data)
-        serializer = self.get_serializer(request.user)
+        user = request.user
+        if not isinstance(user, User):
+            # На чтение пользователь восстановлен из токена, без профиля.
+            user = get_object_or_404(User, pk=user.pk)
+        serializer = self.get_serializer(user)
         return Response(serializer.data)
 
 
@@ -151,9 +304,44 @@ class SignupView(CreateAPIView):
 
     serializer_class = UserSerializer
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, AuthIdentityThrottle]
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TokenView(TokenObtainPairView):
+    """Получение JWT-токена по коду подтверждения."""
+
+    throttle_classes = [AuthIPThrottle, AuthIdentityThrottle]
+
+
+class SearchView(APIView):
+    """
+    Полнотекстовый поиск по произведениям и отзывам.
+    Ссылка: "/api/v1/search/?q=<запрос>".
+    """
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if not search_supported():
+            return Response(
+                {"detail": "Полнотекстовый поиск недоступен."},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        serializer = SearchQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        limit, offset = params["limit"], params["offset"]
+        kinds = (params["type"],) if params["type"] else tuple(SEARCH_KINDS)
+        results = search(params["q"], kinds, limit + 1, offset)
+        next_link = None
+        if len(results) > limit:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "offset", offset + limit
+            )
+        return Response({"next": next_link, "results": results[:limit]})
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.middleware.AnonymousPageCacheMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -114,12 +115,68 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "api.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
+    # Ограничение частоты запросов к /auth/: с одного IP-адреса
+    # и для одного username или email.
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": "30/min",
+        "auth_identity": "5/min",
+    },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # Для общего лимита между процессами одного сервера:
+    # "BACKEND": "api.cache_backends.SQLiteCache",
+    # "LOCATION": BASE_DIR / "throttle.sqlite3",
+    "throttle": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttle",
+    },
+    # Версии данных для ключей кэша и ETag и блокировки вычисления ответов
+    # должны быть общими для всех процессов: SQLite — для процессов одного
+    # сервера, для нескольких серверов нужен Redis или Memcached.
+    "shared": {
+        "BACKEND": "api.cache_backends.SQLiteCache",
+        "LOCATION": BASE_DIR / "shared_cache.sqlite3",
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
+    },
+}
+THROTTLE_CACHE = "throttle"
+SHARED_CACHE = "shared"
+
+# Кэш и оценка `count` в пагинации списков
+COUNT_CACHE_TIMEOUT = 30
+COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Кэш ответов списка и карточки произведения: время жизни и сколько
+# секунд ждать, пока холодный ключ считает другой процесс
+RESPONSE_CACHE_TIMEOUT = 60
+RESPONSE_CACHE_LOCK_TIMEOUT = 5
+
+# Кэш страниц API для запросов без заголовка Authorization: время жизни
+# в секундах для первого подходящего маршрута; остальные не кэшируются
+PAGE_CACHE_PREFIX = "/api/v1/"
+PAGE_CACHE_TIMEOUTS = {
+    r"^/api/v1/(genres|categories)/$": 300,
+    r"^/api/v1/titles/\d+/reviews/": 30,
+    r"^/api/v1/titles/": 60,
+    r"^/api/v1/search/$": 30,
+}
+
+# Сколько секунд процесс помнит проверенные произведения и отзывы
+# во вложенных маршрутах; 0 — проверять при каждом запросе
+PARENT_CACHE_TIMEOUT = 5
+
+# Кэш пользователей процесса для аутентификации запросов на запись
+USER_CACHE_TIMEOUT = 60
+USER_CACHE_SIZE = 1000
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "AUTH_HEADER_TYPES": ("Bearer",),
@@ -128,5 +185,20 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = "users.NewUser"
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Коды подтверждения из HMAC без таблицы OtpCode: код действует
+# OTP_LIFETIME (с точностью до OTP_WINDOW) и гасится после использования
+OTP_STATELESS = True
+OTP_LIFETIME = timedelta(minutes=60)
+OTP_WINDOW = timedelta(minutes=5)
+
+EMAIL_BACKEND = "users.maillog.EmailBackend"
 EMAIL_FILE_PATH = BASE_DIR / "sent_emails"
+# Журнал писем: размер сегмента в байтах и сжатие писем gzip
+EMAIL_LOG_SEGMENT_SIZE = 16 * 1024 * 1024
+EMAIL_LOG_COMPRESS = True
+
+# Очередь писем: попытки отправки, задержка перед повтором (удваивается
+# с каждой попыткой) и аренда выбранной пачки, в секундах
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_DELAY = 30
+EMAIL_OUTBOX_LEASE = 300
@@ -9,6 +9,7 @@ class TitleAdmin(admin.ModelAdmin):
     list_display_links = ("name", "description")
     list_editable = ("category",)
     list_filter = ("genre", "category")
+    readonly_fields = ("rating_sum", "rating_count")
     empty_value_display = "-пусто-"
     search_fields = ("name",)
 
@@ -0,0 +1,87 @@
+"""
+Снимок справочников жанров и категорий в памяти процесса.
+
+Справочники маленькие и почти не меняются, а читаются при каждом
+выводе и фильтрации произведений. Процесс держит их копию вместе
+с версией из таблицы CatalogVersion и перед использованием сверяет
+версию одним запросом по первичному ключу — не чаще раза за запрос
+к API. Запись в справочники в любом процессе меняет версию в той же
+транзакции, и остальные процессы перечитывают снимок на следующем
+запросе.
+"""
+from django.db.models import F
+
+from reviews.models import CatalogVersion, Category, Genre
+
+VERSION_PK = 1
+
+
+class Catalog:
+    """Жанры и категории: по id и по slug, в порядке вывода."""
+
+    def __init__(self, version, genres, categories):
+        self.version = version
+        self.genres = genres
+        self.categories = categories
+        self.genres_by_id = {genre.pk: genre for genre in genres}
+        self.genres_by_slug = {genre.slug: genre for genre in genres}
+        self.categories_by_id = {item.pk: item for item in categories}
+        self.categories_by_slug = {item.slug: item for item in categories}
+
+
+_catalog = None
+
+
+def current_version() -> int:
+    return (
+        CatalogVersion.objects.filter(pk=VERSION_PK)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def load_catalog(version=None) -> Catalog:
+    global _catalog
+    if version is None:
+        version = current_version()
+    _catalog = Catalog(
+        version,
+        list(Genre.objects.order_by("name_key", "pk")),
+        list(Category.objects.order_by("name_key", "pk")),
+    )
+    return _catalog
+
+
+def get_catalog(request=None, reload=False) -> Catalog:
+    """
+    Актуальный снимок справочников.
+
+    С `request` версия сверяется один раз за запрос. `reload` перечитывает
+    справочники, если в снимке не нашлось объекта, на который уже
+    ссылаются данные.
+    """
+    catalog = getattr(request, "_catalog", None)
+    if catalog is None or reload:
+        catalog = _catalog
+        version = current_version()
+        if reload or catalog is None or catalog.version != version:
+            catalog = load_catalog(version)
+        if request is not None:
+            request._catalog = catalog
+    return catalog
+
+
+def bump_catalog_version() -> None:
+    """Вызывается в транзакции, которая пишет в справочники."""
+    CatalogVersion.objects.bulk_create(
+        [CatalogVersion(pk=VERSION_PK)], ignore_conflicts=True
+    )
+    CatalogVersion.objects.filter(pk=VERSION_PK).update(
+        version=F("version") + 1
+    )
+
+
+def clear_catalog() -> None:
+    global _catalog
+    _catalog = None
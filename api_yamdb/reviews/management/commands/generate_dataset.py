@@ -0,0 +1,301 @@
+import csv
+import datetime as dt
+import os
+import random
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from reviews.constans import MAX_SCORE, MIN_SCORE
+from reviews.management.commands.run_all_commands import REJECT_FILE
+
+CATEGORIES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра', 'Спектакль')
+GENRES = (
+    'Драма', 'Комедия', 'Вестерн', 'Фэнтези', 'Фантастика', 'Детектив',
+    'Триллер', 'Сказка', 'Гонзо', 'Ужасы', 'Роман', 'Баллада', 'Рок',
+    'Артхаус', 'Классика', 'Шансон', 'Джаз', 'Документальный',
+)
+WORDS = (
+    'тень', 'ветер', 'город', 'звезда', 'море', 'ночь', 'дорога', 'сердце',
+    'огонь', 'время', 'тайна', 'песня', 'зима', 'память', 'остров', 'лес',
+    'river', 'night', 'blue', 'silent', 'last', 'dream', 'stone', 'light',
+    'ёжик', 'туман', 'мастер', 'сад', 'берег', 'снег', 'война', 'мир',
+)
+# Оценки в реальных каталогах смещены к высоким значениям.
+SCORE_WEIGHTS = (3, 2, 2, 3, 5, 7, 12, 18, 22, 26)
+SCORES = tuple(range(MIN_SCORE, MAX_SCORE + 1))
+START_DATE = dt.datetime(2015, 1, 1, tzinfo=dt.timezone.utc)
+DATE_RANGE = 10 * 365 * 24 * 3600
+# Средняя задержка комментария относительно отзыва, в секундах.
+COMMENT_DELAY = 30 * 24 * 3600
+
+
+class Command(BaseCommand):
+    """Команда генерации синтетического набора данных"""
+    help = (
+        'Генерация воспроизводимого набора данных заданного размера '
+        'в формате CSV, который читает run_all_commands'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--categories', type=int, default=5)
+        parser.add_argument('--genres', type=int, default=20)
+        parser.add_argument('--titles', type=int, default=1000)
+        parser.add_argument(
+            '--reviews',
+            type=int,
+            default=10000,
+            help='Общее число отзывов, распределённых между произведениями',
+        )
+        parser.add_argument(
+            '--comments-per-review',
+            type=float,
+            default=0.5,
+            help='Среднее число комментариев на отзыв',
+        )
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Показатель распределения Ципфа для числа отзывов',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--output',
+            default=None,
+            help=(
+                'Каталог для CSV файлов; без него данные сразу '
+                'загружаются в базу через run_all_commands'
+            ),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одном INSERT при загрузке в базу',
+        )
+        parser.add_argument(
+            '--reject-file',
+            default=REJECT_FILE,
+            help='CSV файл для строк, отклонённых при загрузке в базу',
+        )
+
+    def open_writer(self, filename, header):
+        f = open(
+            os.path.join(self.output, filename),
+            'w',
+            encoding='utf-8',
+            newline='',
+        )
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return f, writer
+
+    def random_date(self, after=None):
+        """Дата в пределах DATE_RANGE или вскоре после `after`."""
+        if after is None:
+            seconds = self.random.uniform(0, DATE_RANGE)
+            return START_DATE + dt.timedelta(seconds=seconds)
+        seconds = self.random.expovariate(1 / COMMENT_DELAY)
+        return after + dt.timedelta(seconds=seconds)
+
+    @staticmethod
+    def format_date(value):
+        return value.strftime('%Y-%m-%dT%H:%M:%S.') + (
+            f'{value.microsecond // 1000:03d}Z'
+        )
+
+    def random_text(self, min_words, max_words):
+        words = self.random.choices(
+            WORDS, k=self.random.randint(min_words, max_words)
+        )
+        return ' '.join(words).capitalize()
+
+    def generate_users(self, count):
+        f, writer = self.open_writer(
+            'users.csv',
+            ('id', 'username', 'email', 'role', 'bio', 'first_name',
+             'last_name'),
+        )
+        with f:
+            for user_id in range(1, count + 1):
+                role = self.random.choices(
+                    ('user', 'moderator', 'admin'), weights=(989, 10, 1)
+                )[0]
+                writer.writerow((
+                    user_id, f'user{user_id}', f'user{user_id}@yamdb.fake',
+                    role, '', '', '',
+                ))
+
+    def generate_named(self, filename, names, count, slug_prefix):
+        f, writer = self.open_writer(filename, ('id', 'name', 'slug'))
+        with f:
+            for item_id in range(1, count + 1):
+                name = names[(item_id - 1) % len(names)]
+                if item_id > len(names):
+                    name = f'{name} {item_id // len(names)}'
+                writer.writerow((item_id, name, f'{slug_prefix}-{item_id}'))
+
+    def generate_titles(self, count, categories, genres):
+        current_year = dt.date.today().year
+        titles_file, titles = self.open_writer(
+            'titles.csv', ('id', 'name', 'year', 'category', 'description')
+        )
+        links_file, links = self.open_writer(
+            'genre_title.csv', ('id', 'title_id', 'genre_id')
+        )
+        link_id = 0
+        with titles_file, links_file:
+            for title_id in range(1, count + 1):
+                year = current_year - int(self.random.expovariate(1 / 25))
+                titles.writerow((
+                    title_id,
+                    self.random_text(1, 4),
+                    max(year, 1600),
+                    self.random.randint(1, categories),
+                    self.random_text(5, 30),
+                ))
+                genre_count = min(genres, self.random.randint(1, 3))
+                for genre_id in self.random.sample(
+                    range(1, genres + 1), k=genre_count
+                ):
+                    link_id += 1
+                    links.writerow((link_id, title_id, genre_id))
+
+    def review_counts(self, titles, reviews, users):
+        """
+        Число отзывов на каждое произведение по закону Ципфа.
+
+        Популярность произведения случайна, но воспроизводима; число
+        отзывов ограничено числом пользователей (один отзыв на автора).
+        Отзывы сверх этого предела достаются остальным произведениям
+        пропорционально их весу, так что в сумме их ровно `reviews`.
+        """
+        ranks = list(range(1, titles + 1))
+        self.random.shuffle(ranks)
+        weights = [1 / rank ** self.zipf for rank in ranks]
+        targets = [0.0] * titles
+        left = reviews
+        rest = sum(weights)
+        order = sorted(range(titles), key=weights.__getitem__, reverse=True)
+        for position, index in enumerate(order):
+            if left * weights[index] / rest < users:
+                for other in order[position:]:
+                    targets[other] = left * weights[other] / rest
+                break
+            targets[index] = users
+            left -= users
+            rest -= weights[index]
+        counts = [int(target) for target in targets]
+        shortfall = reviews - sum(counts)
+        by_remainder = sorted(
+            range(titles),
+            key=lambda index: targets[index] - counts[index],
+            reverse=True,
+        )
+        for index in by_remainder:
+            if not shortfall:
+                break
+            if counts[index] < users:
+                counts[index] += 1
+                shortfall -= 1
+        return counts
+
+    def generate_reviews(self, titles, reviews, users, comments_mean):
+        reviews_file, review_writer = self.open_writer(
+            'review.csv',
+            ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+        )
+        comments_file, comment_writer = self.open_writer(
+            'comments.csv', ('id', 'review_id', 'text', 'author', 'pub_date')
+        )
+        review_id = 0
+        comment_id = 0
+        counts = self.review_counts(titles, reviews, users)
+        with reviews_file, comments_file:
+            for title_id, count in enumerate(counts, 1):
+                for author in self.random.sample(range(1, users + 1), count):
+                    review_id += 1
+                    pub_date = self.random_date()
+                    review_writer.writerow((
+                        review_id,
+                        title_id,
+                        self.random_text(3, 60),
+                        author,
+                        self.random.choices(SCORES, SCORE_WEIGHTS)[0],
+                        self.format_date(pub_date),
+                    ))
+                    comments = 0
+                    if comments_mean > 0:
+                        comments = int(
+                            self.random.expovariate(1 / comments_mean)
+                        )
+                    for _ in range(comments):
+                        comment_id += 1
+                        comment_writer.writerow((
+                            comment_id,
+                            review_id,
+                            self.random_text(2, 30),
+                            self.random.randint(1, users),
+                            self.format_date(self.random_date(pub_date)),
+                        ))
+        return review_id, comment_id
+
+    def generate(self, options):
+        self.generate_users(options['users'])
+        self.generate_named(
+            'category.csv', CATEGORIES, options['categories'], 'category'
+        )
+        self.generate_named('genre.csv', GENRES, options['genres'], 'genre')
+        self.generate_titles(
+            options['titles'], options['categories'], options['genres']
+        )
+        return self.generate_reviews(
+            options['titles'],
+            options['reviews'],
+            options['users'],
+            options['comments_per_review'],
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        for name in ('users', 'categories', 'genres', 'titles'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} должно быть больше нуля')
+        capacity = options['titles'] * options['users']
+        if options['reviews'] > capacity:
+            self.stderr.write(
+                self.style.WARNING(
+                    f'Отзывов не может быть больше {capacity}: '
+                    'не больше одного на пользователя для каждого '
+                    'произведения'
+                )
+            )
+            options['reviews'] = capacity
+        self.random = random.Random(options['seed'])
+        self.zipf = options['zipf']
+
+        if options['output']:
+            self.output = options['output']
+            os.makedirs(self.output, exist_ok=True)
+            reviews, comments = self.generate(options)
+        else:
+            with tempfile.TemporaryDirectory() as self.output:
+                reviews, comments = self.generate(options)
+                call_command(
+                    'run_all_commands',
+                    data_dir=self.output,
+                    batch_size=options['batch_size'],
+                    checkpoint_file=os.path.join(self.output, 'checkpoint'),
+                    reject_file=options['reject_file'],
+                    stdout=self.stdout,
+                )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Сгенерировано: пользователей {options["users"]}, '
+                f'произведений {options["titles"]}, отзывов {reviews}, '
+                f'комментариев {comments}'
+            )
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.ratings import find_rating_drift, rebuild_ratings
+
+
+class Command(BaseCommand):
+    """Команда пересчёта рейтингов произведений"""
+    help = (
+        'Пересчёт сохранённых агрегатов рейтинга произведений '
+        'и проверка их расхождения с отзывами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить расхождения, ничего не меняя',
+        )
+
+    def report_drift(self) -> int:
+        """Вывод произведений с расходящимися агрегатами."""
+        drift = 0
+        for title_id, stored_sum, stored_count, sum_, count in (
+            find_rating_drift().iterator()
+        ):
+            drift += 1
+            self.stdout.write(
+                self.style.WARNING(
+                    f'Произведение {title_id}: сохранено '
+                    f'{stored_sum}/{stored_count}, по отзывам {sum_}/{count}'
+                )
+            )
+        return drift
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        drift = self.report_drift()
+        if options['check']:
+            if drift:
+                raise CommandError(
+                    f'Расхождение рейтинга у произведений: {drift}'
+                )
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        with transaction.atomic():
+            updated = rebuild_ratings()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Рейтинги пересчитаны: {updated} произведений, '
+                f'исправлено расхождений: {drift}'
+            )
+        )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from reviews.search import rebuild_search_index, search_supported
+
+
+class Command(BaseCommand):
+    """Команда перестройки полнотекстового индекса"""
+    help = 'Перестройка индекса FTS5 по произведениям и отзывам с нуля'
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        if not search_supported():
+            raise CommandError(
+                'Полнотекстовый поиск доступен только для SQLite'
+            )
+        with transaction.atomic():
+            rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -1,173 +1,451 @@
 import csv
+import json
+import os
+import time
+from contextlib import contextmanager
 
-from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
 
-from reviews.models import Category, Genre, Title
+from reviews.catalog import bump_catalog_version
+from reviews.constans import MAX_SCORE, MIN_SCORE
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.ratings import rebuild_ratings
+from reviews.utils import make_name_key
+
+User = get_user_model()
+
+DATA_DIR = 'static/data'
+BATCH_SIZE = 1000
+CHECKPOINT_FILE = 'import_checkpoint.json'
+REJECT_FILE = 'import_rejects.csv'
+
+
+class RowError(Exception):
+    """Строка CSV не может быть импортирована."""
+
+
+class CsvCursor:
+    """
+    Чтение CSV с отслеживанием смещения в байтах.
+
+    После каждой прочитанной записи `offset` указывает на начало
+    следующей, поэтому чтение можно продолжить с этого места,
+    в том числе для записей с переносами строк внутри кавычек.
+    """
+
+    def __init__(self, f, offset=0, row_number=0):
+        self.file = f
+        self.header = next(csv.reader([f.readline().decode('utf-8-sig')]))
+        if offset:
+            f.seek(offset)
+        self.offset = f.tell()
+        self.row_number = row_number
+
+    def lines(self):
+        for line in self.file:
+            self.offset += len(line)
+            yield line.decode('utf-8')
+
+    def __iter__(self):
+        for values in csv.reader(self.lines()):
+            self.row_number += 1
+            yield dict(zip(self.header, values))
+
+
+class Checkpoint:
+    """Позиция импорта по каждому файлу, сохраняемая после каждой порции."""
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.files = {}
+        if resume and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.files = json.load(f)['files']
+
+    def position(self, filename):
+        state = self.files.get(filename, {})
+        return state.get('offset', 0), state.get('row', 0)
+
+    def is_done(self, filename):
+        return self.files.get(filename, {}).get('done', False)
+
+    def save(self, filename, offset, row, done=False):
+        self.files[filename] = {'offset': offset, 'row': row, 'done': done}
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@contextmanager
+def keep_auto_now(model):
+    """Сохранение дат из CSV вместо подстановки auto_now_add."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def parse_pub_date(value):
+    pub_date = parse_datetime(value)
+    if pub_date is None:
+        raise RowError(f'неверная дата {value!r}')
+    return pub_date
 
 
 class Command(BaseCommand):
     """Команда импорт данных"""
     help = (
-        'Импорт данных из CSV файлов для '
-        'категорий, жанров, произведений и их связей'
+        'Импорт данных из CSV файлов для пользователей, категорий, жанров, '
+        'произведений и их связей, отзывов и комментариев'
     )
 
-    def import_categories(self) -> None:
-        """Импорт категорий из CSV файла."""
-        try:
-            with open('static/data/category.csv', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    Category.objects.get_or_create(
-                        id=row['id'],
-                        name=row['name'],
-                        slug=row['slug']
-                    )
-                self.stdout.write(
-                    self.style.SUCCESS('Категории успешно импортированы')
-                )
-        except FileNotFoundError:
-            self.stdout.write(
-                self.style.WARNING('Файл category.csv не найден')
-            )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Ошибка при импорте категорий: {e}')
-            )
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir',
+            default=DATA_DIR,
+            help='Каталог с CSV файлами',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Количество строк в одном INSERT',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help=(
+                'Фиксировать транзакцию каждые N строк и сохранять '
+                'контрольную точку; по умолчанию — одна транзакция на файл'
+            ),
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Продолжить импорт с сохранённой контрольной точки',
+        )
+        parser.add_argument(
+            '--checkpoint-file',
+            default=CHECKPOINT_FILE,
+            help='Файл контрольной точки',
+        )
+        parser.add_argument(
+            '--reject-file',
+            default=REJECT_FILE,
+            help='CSV файл для строк, которые не удалось импортировать',
+        )
 
-    def import_genres(self):
-        """Импорт жанров из CSV файла."""
+    def import_file(self, filename, label, model, build) -> None:
+        """
+        Потоковый импорт одного CSV файла пакетными INSERT.
+
+        `build` превращает строку в объект модели или бросает RowError;
+        такие строки пишутся в файл отклонённых строк, уже существующие
+        записи пропускаются. Транзакция фиксируется после каждой порции
+        из --chunk-size строк (или один раз на файл), после чего
+        дописываются её отклонённые строки и сохраняется контрольная
+        точка: при откате порции они не попадут в файл дважды.
+        Число добавленных строк считается по таблице до и после
+        импорта, так как ignore_conflicts не сообщает о пропущенных
+        записях.
+        """
+        if self.checkpoint.is_done(filename):
+            self.stdout.write(f'{label}: файл {filename} уже импортирован')
+            return
+        path = os.path.join(self.data_dir, filename)
+        offset, row_number = self.checkpoint.position(filename)
+        before = model.objects.count()
+        success_count = 0
+        error_count = 0
+        started = time.monotonic()
         try:
-            with open('static/data/genre.csv', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    Genre.objects.get_or_create(
-                        id=row['id'],
-                        name=row['name'],
-                        slug=row['slug']
+            with open(path, 'rb') as f:
+                cursor = CsvCursor(f, offset, row_number)
+                records = iter(cursor)
+                done = False
+                while not done:
+                    with transaction.atomic():
+                        success, rejects, done = self.import_chunk(
+                            model, build, cursor, records
+                        )
+                    success_count += success
+                    error_count += len(rejects)
+                    for row_number, error, row in rejects:
+                        self.reject(filename, row_number, error, row)
+                    self.rejects_file.flush()
+                    self.checkpoint.save(
+                        filename, cursor.offset, cursor.row_number, done
                     )
-                self.stdout.write(
-                    self.style.SUCCESS('Жанры успешно импортированы')
-                )
+                    if self.verbosity > 1:
+                        self.stdout.write(
+                            f'{label}: зафиксировано до строки '
+                            f'{cursor.row_number}'
+                        )
         except FileNotFoundError:
             self.stdout.write(
-                self.style.WARNING('Файл genre.csv не найден')
+                self.style.WARNING(f'Файл {filename} не найден')
             )
+            return
         except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Ошибка при импорте жанров: {e}')
+            raise CommandError(
+                f'Ошибка при импорте ({label}): {e}. Импорт прерван, '
+                'продолжить можно с параметром --resume'
             )
+        elapsed = time.monotonic() - started
+        rate = (success_count + error_count) / elapsed if elapsed else 0
+        inserted = model.objects.count() - before
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{label} импортированы: {inserted} добавлено, '
+                f'{success_count - inserted} уже существовали, '
+                f'{error_count} с ошибками, {rate:.0f} строк/с'
+            )
+        )
 
-    def import_titles(self):
-        """Импорт произведений из CSV файла."""
+    def import_chunk(self, model, build, cursor, records):
+        """
+        Импорт очередной порции строк.
 
-        try:
-            with open('static/data/titles.csv', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                success_count = 0
-                error_count = 0
-
-                for row in reader:
-                    try:
-                        category = Category.objects.get(id=row['category'])
-
-                        Title.objects.get_or_create(
-                            id=row['id'],
-                            name=row['name'],
-                            year=row['year'],
-                            category=category
-                        )
-                        success_count += 1
+        Возвращает число отправленных в базу строк, отклонённые строки
+        порции в виде (номер, ошибка, строка) и признак того, что файл
+        прочитан до конца.
+        """
+        batch = []
+        rejects = []
+        success_count = 0
+        processed = 0
+        for row in records:
+            processed += 1
+            try:
+                batch.append(build(row))
+            except (RowError, KeyError, ValueError) as e:
+                rejects.append((cursor.row_number, e, row))
+            if len(batch) >= self.batch_size:
+                success_count += self.flush(model, batch)
+            if processed == self.chunk_size:
+                break
+        else:
+            success_count += self.flush(model, batch)
+            return success_count, rejects, True
+        success_count += self.flush(model, batch)
+        return success_count, rejects, False
 
-                    except Category.DoesNotExist:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'Категория с id {row["category"]} '
-                                f'не найдена. '
-                                f'Пропускаем произведение: '
-                                f'{row["name"]} (id: {row["id"]})'
-                            )
-                        )
-                        error_count += 1
+    def reject(self, filename, row_number, error, row) -> None:
+        """Запись отклонённой строки вместо вывода в консоль."""
+        self.rejects.writerow(
+            [filename, row_number, error, json.dumps(row, ensure_ascii=False)]
+        )
 
-                    except ValueError as e:
-                        self.stdout.write(
-                            self.style.ERROR(
-                                f'Ошибка данных в строке: {row}. Ошибка: {e}'
-                            )
-                        )
-                        error_count += 1
+    def flush(self, model, batch) -> int:
+        """
+        Запись накопленного пакета.
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Произведения импортированы: {success_count} успешно,'
-                        f'{error_count} с ошибками'
-                    )
-                )
+        Возвращает число отправленных строк: уже существующие записи
+        тоже входят в него, так как ignore_conflicts их молча пропускает.
+        """
+        count = len(batch)
+        if batch:
+            model.objects.bulk_create(
+                batch, batch_size=self.batch_size, ignore_conflicts=True
+            )
+            batch.clear()
+        return count
 
-        except FileNotFoundError:
-            self.stdout.write(
-                self.style.WARNING('Файл titles.csv не найден')
+    def import_users(self) -> None:
+        """Импорт пользователей из CSV файла."""
+        roles = set(User.Role.values)
+
+        def build(row):
+            role = row.get('role') or User.Role.USER
+            if role not in roles:
+                raise RowError(f'неизвестная роль {role!r}')
+            return User(
+                id=int(row['id']),
+                username=row['username'],
+                email=row['email'],
+                role=role,
+                bio=row.get('bio') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                password=make_password(None),
             )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Ошибка при импорте произведений: {e}')
+
+        self.import_file('users.csv', 'Пользователи', User, build)
+
+    def import_categories(self) -> None:
+        """Импорт категорий из CSV файла."""
+        self.import_file(
+            'category.csv',
+            'Категории',
+            Category,
+            lambda row: Category(
+                id=int(row['id']),
+                name=row['name'],
+                name_key=make_name_key(row['name']),
+                slug=row['slug'],
+            ),
+        )
+
+    def import_genres(self):
+        """Импорт жанров из CSV файла."""
+        self.import_file(
+            'genre.csv',
+            'Жанры',
+            Genre,
+            lambda row: Genre(
+                id=int(row['id']),
+                name=row['name'],
+                name_key=make_name_key(row['name']),
+                slug=row['slug'],
+            ),
+        )
+
+    def import_titles(self):
+        """Импорт произведений из CSV файла."""
+        category_ids = set(Category.objects.values_list('id', flat=True))
+
+        def build(row):
+            category_id = int(row['category'])
+            if category_id not in category_ids:
+                raise RowError(f'категория с id {category_id} не найдена')
+            return Title(
+                id=int(row['id']),
+                name=row['name'],
+                name_key=make_name_key(row['name']),
+                year=int(row['year']),
+                description=row.get('description') or '',
+                category_id=category_id,
             )
 
+        self.import_file('titles.csv', 'Произведения', Title, build)
+
     def import_genre_relations(self):
         """Импорт связей между жанрами и произведениями из CSV файла."""
-        try:
-            with open('static/data/genre_title.csv', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                success_count = 0
-                error_count = 0
+        title_ids = set(Title.objects.values_list('id', flat=True))
+        genre_ids = set(Genre.objects.values_list('id', flat=True))
+        relation = Title.genre.through
 
-                for row in reader:
-                    try:
-                        title = Title.objects.get(id=row['title_id'])
-                        genre = Genre.objects.get(id=row['genre_id'])
+        def build(row):
+            title_id = int(row['title_id'])
+            genre_id = int(row['genre_id'])
+            if title_id not in title_ids:
+                raise RowError(f'произведение с id {title_id} не найдено')
+            if genre_id not in genre_ids:
+                raise RowError(f'жанр с id {genre_id} не найден')
+            return relation(title_id=title_id, genre_id=genre_id)
 
-                        title.genre.add(genre)
-                        success_count += 1
+        self.import_file('genre_title.csv', 'Связи', relation, build)
 
-                    except (Title.DoesNotExist, Genre.DoesNotExist) as e:
-                        self.stdout.write(
-                            self.style.WARNING(
-                                f'Объект не найден: {e}. '
-                                f'Пропускаем связь: '
-                                f'title_id={row["title_id"]}, '
-                                f'genre_id={row["genre_id"]}'
-                            )
-                        )
-                        error_count += 1
+    def import_reviews(self):
+        """Импорт отзывов из CSV файла и пересчёт рейтингов."""
+        title_ids = set(Title.objects.values_list('id', flat=True))
+        author_ids = set(User.objects.values_list('id', flat=True))
 
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Связи импортированы: {success_count} успешно, '
-                        f'{error_count} с ошибками'
-                    )
-                )
-
-        except FileNotFoundError:
-            self.stdout.write(
-                self.style.WARNING('Файл genre_title.csv не найден')
+        def build(row):
+            title_id = int(row['title_id'])
+            author_id = int(row['author'])
+            score = int(row['score'])
+            if title_id not in title_ids:
+                raise RowError(f'произведение с id {title_id} не найдено')
+            if author_id not in author_ids:
+                raise RowError(f'пользователь с id {author_id} не найден')
+            if not MIN_SCORE <= score <= MAX_SCORE:
+                raise RowError(f'оценка {score} вне диапазона')
+            return Review(
+                id=int(row['id']),
+                title_id=title_id,
+                author_id=author_id,
+                text=row['text'],
+                score=score,
+                pub_date=parse_pub_date(row['pub_date']),
             )
-        except Exception as e:
-            self.stdout.write(
-                self.style.ERROR(f'Ошибка при импорте связей: {e}')
+
+        with keep_auto_now(Review):
+            self.import_file('review.csv', 'Отзывы', Review, build)
+        with transaction.atomic():
+            rebuild_ratings()
+
+    def import_comments(self):
+        """Импорт комментариев из CSV файла."""
+        review_ids = set(Review.objects.values_list('id', flat=True))
+        author_ids = set(User.objects.values_list('id', flat=True))
+
+        def build(row):
+            review_id = int(row['review_id'])
+            author_id = int(row['author'])
+            if review_id not in review_ids:
+                raise RowError(f'отзыв с id {review_id} не найден')
+            if author_id not in author_ids:
+                raise RowError(f'пользователь с id {author_id} не найден')
+            return Comment(
+                id=int(row['id']),
+                review_id=review_id,
+                author_id=author_id,
+                text=row['text'],
+                pub_date=parse_pub_date(row['pub_date']),
             )
 
+        with keep_auto_now(Comment):
+            self.import_file('comments.csv', 'Комментарии', Comment, build)
+
     def handle(self, *args, **options) -> None:
         """Основной метод выполнения команды."""
+        self.data_dir = options['data_dir']
+        self.batch_size = options['batch_size']
+        self.chunk_size = options['chunk_size']
+        self.verbosity = options['verbosity']
+        self.checkpoint = Checkpoint(
+            options['checkpoint_file'], resume=options['resume']
+        )
+        resume = options['resume'] and os.path.exists(options['reject_file'])
         self.stdout.write('Начинаем импорт данных...')
 
-        self.import_categories()
-        self.import_genres()
-        self.import_titles()
-        self.import_genre_relations()
+        with open(
+            options['reject_file'], 'a' if resume else 'w', encoding='utf-8'
+        ) as self.rejects_file:
+            self.rejects = csv.writer(self.rejects_file)
+            if not resume:
+                self.rejects.writerow(['file', 'row', 'error', 'data'])
+            self.import_users()
+            self.import_categories()
+            self.import_genres()
+            # bulk_create не отправляет сигналов: работающие процессы
+            # перечитают справочники по новой версии.
+            bump_catalog_version()
+            self.import_titles()
+            self.import_genre_relations()
+            self.import_reviews()
+            self.import_comments()
+        self.checkpoint.remove()
 
         self.stdout.write(self.style.SUCCESS('\nИмпорт завершен!'))
+        self.stdout.write(
+            f'Отклонённые строки записаны в {options["reject_file"]}'
+        )
+        self.stdout.write(f'Пользователей: {User.objects.count()}')
         self.stdout.write(f'Категорий: {Category.objects.count()}')
         self.stdout.write(f'Жанров: {Genre.objects.count()}')
         self.stdout.write(f'Произведений: {Title.objects.count()}')
-        self.stdout.write('Связей жанров и произведений импортировано')
+        self.stdout.write(
+            f'Связей жанров и произведений: '
+            f'{Title.genre.through.objects.count()}'
+        )
+        self.stdout.write(f'Отзывов: {Review.objects.count()}')
+        self.stdout.write(f'Комментариев: {Comment.objects.count()}')
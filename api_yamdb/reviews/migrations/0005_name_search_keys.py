@@ -0,0 +1,67 @@
+import unicodedata
+
+from django.db import migrations, models
+
+
+def make_name_key(value):
+    key = unicodedata.normalize('NFKC', value or '').casefold()
+    key = key.replace('ё', 'е')
+    return ' '.join(key.split())[:256]
+
+
+def fill_name_keys(apps, schema_editor):
+    for model_name in ('Title', 'Genre', 'Category'):
+        model = apps.get_model('reviews', model_name)
+        objects = list(model.objects.only('id', 'name'))
+        for obj in objects:
+            obj.name_key = make_name_key(obj.name)
+        model.objects.bulk_update(objects, ['name_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_title_name_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=256, verbose_name='Ключ поиска'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='ключ поиска'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='name_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=256, verbose_name='ключ поиска'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='title',
+            name='title_name_id_idx',
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['name_key', 'id'], name='title_name_key_id_idx'),
+        ),
+        migrations.AlterModelOptions(
+            name='title',
+            options={'ordering': ('name_key', 'id')},
+        ),
+        migrations.AlterModelOptions(
+            name='category',
+            options={'ordering': ('name_key',), 'verbose_name': 'категория', 'verbose_name_plural': 'Категории'},
+        ),
+        migrations.AlterModelOptions(
+            name='genre',
+            options={'ordering': ('name_key',), 'verbose_name': 'жанр', 'verbose_name_plural': 'Жанры'},
+        ),
+    ]
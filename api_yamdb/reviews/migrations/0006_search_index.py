@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from reviews.search import drop_search_index, install_search_index
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        install_search_index(schema_editor.execute)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_search_index(schema_editor.execute)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_name_search_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
@@ -4,6 +4,7 @@ from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from .utils import make_name_key
 from .validators import validate_year
 from reviews.constans import (
     CHAR_FIELD_MAX_LENGTH,
@@ -15,6 +16,8 @@ from reviews.constans import (
 
 User = get_user_model()
 
+RATING_FIELDS = ("rating_sum", "rating_count")
+
 
 def current_year():
     return dt.datetime.today().year
@@ -36,7 +39,11 @@ class Title(models.Model):
     )
     name = models.CharField(
         max_length=CHAR_FIELD_MAX_LENGTH,
-        db_index=True,
+    )
+    name_key = models.CharField(
+        max_length=CHAR_FIELD_MAX_LENGTH,
+        editable=False,
+        verbose_name="Ключ поиска",
     )
     year = models.SmallIntegerField(
         db_index=True,
@@ -51,13 +58,53 @@ class Title(models.Model):
     description = models.TextField(
         blank=True,
     )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Сумма оценок",
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество оценок",
+    )
 
     class Meta:
-        ordering = ("name",)
+        ordering = ("name_key", "id")
+        indexes = [
+            # Покрывает сортировку списка, курсорную пагинацию
+            # и поиск по префиксу названия.
+            models.Index(
+                fields=("name_key", "id"), name="title_name_key_id_idx"
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name[:50]
 
+    def save(self, *args, **kwargs):
+        """Агрегаты рейтинга меняются только через UPDATE с F-выражениями.
+
+        При сохранении существующего объекта они исключаются из запроса,
+        чтобы устаревшие значения в памяти не затёрли свежие.
+        """
+        self.name_key = make_name_key(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_key"}
+        if not self._state.adding and update_fields is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating(self):
+        """Средняя оценка по сохранённым агрегатам отзывов."""
+        if not self.rating_count:
+            return None
+        return self.rating_sum / self.rating_count
+
 
 class NameSlug(models.Model):
     name = models.CharField(
@@ -68,14 +115,27 @@ class NameSlug(models.Model):
         verbose_name="идентификатор",
         unique=True,
     )
+    name_key = models.CharField(
+        max_length=CHAR_FIELD_MAX_LENGTH,
+        db_index=True,
+        editable=False,
+        verbose_name="ключ поиска",
+    )
 
     class Meta:
         abstract = True
-        ordering = ("name",)
+        ordering = ("name_key",)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.name_key = make_name_key(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "name_key"}
+        super().save(*args, **kwargs)
+
 
 class Category(NameSlug):
     """Модель категорий."""
@@ -137,6 +197,14 @@ class Review(models.Model):
         verbose_name_plural = "Отзывы"
         # Свежие отзывы показываются первыми
         ordering = ["-pub_date"]
+        indexes = [
+            # Отзывы произведения по дате без сортировки во временном
+            # B-дереве, в том числе в режиме курсора.
+            models.Index(
+                fields=("title", "pub_date", "id"),
+                name="review_title_pub_date_idx",
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("title", "author"),
@@ -177,6 +245,29 @@ class Comment(models.Model):
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
         ordering = ["pub_date"]
+        indexes = [
+            models.Index(
+                fields=("review", "pub_date", "id"),
+                name="comment_review_pub_date_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Комментарий {self.author} к отзыву {self.review_id}"
+
+
+class CatalogVersion(models.Model):
+    """Версия справочников жанров и категорий.
+
+    Одна строка; её значение растёт при каждой записи в справочники,
+    по нему процессы узнают, что их снимок справочников устарел.
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Версия справочников"
+        verbose_name_plural = "Версии справочников"
+
+    def __str__(self):
+        return str(self.version)
@@ -0,0 +1,59 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from reviews.models import Review, Title
+
+
+def shift_rating(title_id: int, score: int = 0, count: int = 0) -> None:
+    """Сдвиг агрегатов рейтинга произведения одним UPDATE.
+
+    Вызывается сигналами отзыва внутри транзакции, в которой он
+    меняется, поэтому агрегаты верны и при каскадном удалении.
+    """
+    Title.objects.filter(pk=title_id).update(
+        rating_sum=F("rating_sum") + score,
+        rating_count=F("rating_count") + count,
+    )
+
+
+def _review_aggregate(aggregate):
+    return Coalesce(
+        Subquery(
+            Review.objects.filter(title=OuterRef("pk"))
+            .order_by()
+            .values("title")
+            .annotate(value=aggregate)
+            .values("value"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def rebuild_ratings(queryset=None) -> int:
+    """Пересчёт агрегатов рейтинга по таблице отзывов."""
+    if queryset is None:
+        queryset = Title.objects.all()
+    return queryset.update(
+        rating_sum=_review_aggregate(Sum("score")),
+        rating_count=_review_aggregate(Count("id")),
+    )
+
+
+def find_rating_drift(queryset=None):
+    """Произведения, у которых агрегаты расходятся с отзывами."""
+    if queryset is None:
+        queryset = Title.objects.all()
+    return (
+        queryset.annotate(
+            actual_sum=_review_aggregate(Sum("score")),
+            actual_count=_review_aggregate(Count("id")),
+        )
+        .exclude(
+            rating_sum=F("actual_sum"),
+            rating_count=F("actual_count"),
+        )
+        .values_list(
+            "id", "rating_sum", "rating_count", "actual_sum", "actual_count"
+        )
+    )
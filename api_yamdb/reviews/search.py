@@ -0,0 +1,178 @@
+import html
+import re
+
+from django.db import connection
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Индекс с внешним содержимым: тексты хранятся только в таблицах моделей,
+# а триггеры синхронизируют индекс при любой записи, включая bulk_create.
+# SQLite теряет триггеры, когда миграция пересоздаёт таблицу, поэтому такие
+# миграции должны заново вызывать install_search_index.
+SEARCH_INDEX_SQL = (
+    """
+    CREATE VIRTUAL TABLE title_fts USING fts5(
+        name, description,
+        content='reviews_title', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER title_fts_insert AFTER INSERT ON reviews_title BEGIN
+        INSERT INTO title_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER title_fts_delete AFTER DELETE ON reviews_title BEGIN
+        INSERT INTO title_fts(title_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER title_fts_update
+    AFTER UPDATE OF name, description ON reviews_title BEGIN
+        INSERT INTO title_fts(title_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO title_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE review_fts USING fts5(
+        text,
+        content='reviews_review', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER review_fts_insert AFTER INSERT ON reviews_review BEGIN
+        INSERT INTO review_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER review_fts_delete AFTER DELETE ON reviews_review BEGIN
+        INSERT INTO review_fts(review_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER review_fts_update
+    AFTER UPDATE OF text ON reviews_review BEGIN
+        INSERT INTO review_fts(review_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO review_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+)
+
+REBUILD_SEARCH_INDEX_SQL = (
+    "INSERT INTO title_fts(title_fts) VALUES ('rebuild')",
+    "INSERT INTO review_fts(review_fts) VALUES ('rebuild')",
+)
+
+DROP_SEARCH_INDEX_SQL = (
+    "DROP TRIGGER IF EXISTS title_fts_insert",
+    "DROP TRIGGER IF EXISTS title_fts_delete",
+    "DROP TRIGGER IF EXISTS title_fts_update",
+    "DROP TRIGGER IF EXISTS review_fts_insert",
+    "DROP TRIGGER IF EXISTS review_fts_delete",
+    "DROP TRIGGER IF EXISTS review_fts_update",
+    "DROP TABLE IF EXISTS title_fts",
+    "DROP TABLE IF EXISTS review_fts",
+)
+
+TITLE_SEARCH_SQL = """
+    SELECT 'title', rowid, rowid,
+           snippet(title_fts, -1, %s, %s, '…', 16),
+           bm25(title_fts, 10.0, 1.0) AS rank
+    FROM title_fts WHERE title_fts MATCH %s
+"""
+REVIEW_SEARCH_SQL = """
+    SELECT 'review', review_fts.rowid, reviews_review.title_id,
+           snippet(review_fts, 0, %s, %s, '…', 16),
+           bm25(review_fts) AS rank
+    FROM review_fts
+    JOIN reviews_review ON reviews_review.id = review_fts.rowid
+    WHERE review_fts MATCH %s
+"""
+SEARCH_KINDS = {"title": TITLE_SEARCH_SQL, "review": REVIEW_SEARCH_SQL}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# snippet() расставляет непечатаемые метки: текст отзывов экранируется,
+# и только потом метки заменяются на теги подсветки.
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+
+def search_supported() -> bool:
+    return connection.vendor == "sqlite"
+
+
+def build_match_query(text: str):
+    """
+    Запрос FTS5 из пользовательской строки.
+
+    Каждое слово берётся в кавычки, чтобы символы синтаксиса FTS5
+    не приводили к ошибке; последнее слово ищется как префикс.
+    """
+    tokens = TOKEN_RE.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(text: str, kinds=tuple(SEARCH_KINDS), limit=10, offset=0):
+    """Поиск по произведениям и отзывам, отсортированный по релевантности."""
+    match = build_match_query(text)
+    if match is None:
+        return []
+    parts = [SEARCH_KINDS[kind] for kind in kinds]
+    params = [MATCH_START, MATCH_END, match] * len(parts)
+    sql = " UNION ALL ".join(parts) + " ORDER BY rank LIMIT %s OFFSET %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit, offset])
+        rows = cursor.fetchall()
+    return [
+        {
+            "type": kind,
+            "id": object_id,
+            "title_id": title_id,
+            "snippet": highlight(snippet),
+            "rank": rank,
+        }
+        for kind, object_id, title_id, snippet, rank in rows
+    ]
+
+
+def highlight(snippet: str) -> str:
+    """Фрагмент как безопасный HTML с подсветкой совпадений."""
+    return (
+        html.escape(snippet)
+        .replace(MATCH_START, HIGHLIGHT_START)
+        .replace(MATCH_END, HIGHLIGHT_END)
+    )
+
+
+def install_search_index(execute) -> None:
+    """Пересоздание таблиц индекса и триггеров с полной индексацией."""
+    for statement in (
+        *DROP_SEARCH_INDEX_SQL,
+        *SEARCH_INDEX_SQL,
+        *REBUILD_SEARCH_INDEX_SQL,
+    ):
+        execute(statement)
+
+
+def drop_search_index(execute) -> None:
+    for statement in DROP_SEARCH_INDEX_SQL:
+        execute(statement)
+
+
+def rebuild_search_index() -> None:
+    """Перестройка индекса с нуля по содержимому таблиц."""
+    with connection.cursor() as cursor:
+        install_search_index(cursor.execute)
@@ -0,0 +1,19 @@
+import unicodedata
+
+from reviews.constans import CHAR_FIELD_MAX_LENGTH
+
+# Верхняя граница для поиска по префиксу через диапазон ключей.
+MAX_KEY_CHAR = "\U0010ffff"
+
+
+def make_name_key(value: str) -> str:
+    """
+    Ключ названия для поиска и сортировки.
+
+    Строка приводится к NFKC и casefold, «ё» приравнивается к «е»,
+    пробелы схлопываются. В отличие от LIKE в SQLite, это корректно
+    работает с регистром не только латиницы.
+    """
+    key = unicodedata.normalize("NFKC", value or "").casefold()
+    key = key.replace("ё", "е")
+    return " ".join(key.split())[:CHAR_FIELD_MAX_LENGTH]
@@ -0,0 +1,212 @@
+"""
+Почтовый бэкенд, который складывает письма в журнал из сегментов.
+
+Письма дописываются в конец текущего сегмента; когда сегмент превышает
+EMAIL_LOG_SEGMENT_SIZE байт, начинается новый. С EMAIL_LOG_COMPRESS каждое
+письмо сжимается отдельным gzip-блоком: сегмент по-прежнему читается
+через zcat, а любое письмо можно прочитать по смещению. Смещения писем
+по получателям хранятся в индексе index.sqlite3 рядом с сегментами,
+поэтому поиск последнего письма не просматривает каталог.
+"""
+import gzip
+import os
+import re
+import sqlite3
+import time
+from email import message_from_bytes, policy
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.base import BaseEmailBackend
+
+INDEX_NAME = "index.sqlite3"
+SEPARATOR = b"\n" + b"-" * 79 + b"\n"
+CODE_RE = re.compile(r"\b(\d{6})\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    number INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    recipient TEXT NOT NULL,
+    segment INTEGER NOT NULL REFERENCES segments (number),
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_recipient_idx
+    ON messages (recipient, id);
+"""
+
+
+class MailLog:
+    """Журнал писем в каталоге `path`."""
+
+    def __init__(self, path=None, segment_size=None, compress=None):
+        self.path = os.path.abspath(path or settings.EMAIL_FILE_PATH)
+        self.segment_size = segment_size or settings.EMAIL_LOG_SEGMENT_SIZE
+        if compress is None:
+            compress = settings.EMAIL_LOG_COMPRESS
+        self.compress = compress
+        self.db = None
+
+    def open(self):
+        if self.db is not None:
+            return False
+        try:
+            os.makedirs(self.path, exist_ok=True)
+        except OSError as error:
+            raise ImproperlyConfigured(
+                f"Не удалось создать каталог журнала писем {self.path}: "
+                f"{error}"
+            )
+        # Транзакции открываются явно в append; WAL не блокирует поиск
+        # писем на время записи.
+        self.db = sqlite3.connect(
+            os.path.join(self.path, INDEX_NAME),
+            timeout=30,
+            isolation_level=None,
+        )
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        return True
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def segment_path(self, name):
+        return os.path.join(self.path, name)
+
+    def current_segment(self):
+        """Номер и имя сегмента для записи, с ротацией по размеру."""
+        row = self.db.execute(
+            "SELECT number, name FROM segments ORDER BY number DESC LIMIT 1"
+        ).fetchone()
+        if row is not None:
+            number, name = row
+            path = self.segment_path(name)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < self.segment_size and (
+                name.endswith(".gz") == self.compress
+            ):
+                return number, name
+            number += 1
+        else:
+            number = 1
+        name = f"{number:06d}.log" + (".gz" if self.compress else "")
+        self.db.execute(
+            "INSERT INTO segments (number, name) VALUES (?, ?)",
+            (number, name),
+        )
+        return number, name
+
+    def append(self, messages):
+        """Запись писем Django в журнал; возвращает число записанных."""
+        # BEGIN IMMEDIATE сериализует запись из нескольких процессов.
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for message in messages:
+                self.append_one(message)
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+        return len(messages)
+
+    def append_one(self, message):
+        data = message.message().as_bytes() + SEPARATOR
+        if self.compress:
+            data = gzip.compress(data, mtime=0)
+        number, name = self.current_segment()
+        with open(self.segment_path(name), "ab") as segment:
+            offset = segment.tell()
+            segment.write(data)
+        created_at = time.time()
+        self.db.executemany(
+            "INSERT INTO messages "
+            "(recipient, segment, offset, length, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (recipient.lower(), number, offset, len(data), created_at)
+                for recipient in set(message.recipients())
+            ],
+        )
+
+    def read(self, name, offset, length):
+        with open(self.segment_path(name), "rb") as segment:
+            segment.seek(offset)
+            data = segment.read(length)
+        if name.endswith(".gz"):
+            data = gzip.decompress(data)
+        return message_from_bytes(
+            data[: -len(SEPARATOR)], policy=policy.default
+        )
+
+    def latest(self, email):
+        """Последнее письмо на адрес `email` или None."""
+        opened = self.open()
+        try:
+            row = self.db.execute(
+                "SELECT segments.name, offset, length FROM messages "
+                "JOIN segments ON segments.number = messages.segment "
+                "WHERE recipient = ? ORDER BY messages.id DESC LIMIT 1",
+                (email.lower(),),
+            ).fetchone()
+        finally:
+            if opened:
+                self.close()
+        if row is None:
+            return None
+        return self.read(*row)
+
+
+def latest_code(email, path=None):
+    """Код подтверждения из последнего письма на адрес `email`."""
+    message = MailLog(path).latest(email)
+    if message is None:
+        return None
+    body = message.get_body(preferencelist=("plain",)).get_content()
+    match = CODE_RE.search(body)
+    return match.group(1) if match else None
+
+
+class EmailBackend(BaseEmailBackend):
+    """Бэкенд, записывающий письма в журнал MailLog."""
+
+    def __init__(
+        self,
+        *args,
+        file_path=None,
+        segment_size=None,
+        compress=None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.log = MailLog(file_path, segment_size, compress)
+
+    def open(self):
+        return self.log.open()
+
+    def close(self):
+        self.log.close()
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        messages = [
+            message for message in email_messages if message.recipients()
+        ]
+        opened = self.open()
+        try:
+            return self.log.append(messages)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        finally:
+            if opened:
+                self.close()
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.maillog import latest_code
+
+
+class Command(BaseCommand):
+    """Команда поиска кода подтверждения в журнале писем"""
+    help = 'Код подтверждения из последнего письма на указанный адрес'
+
+    def add_arguments(self, parser):
+        parser.add_argument('email')
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        code = latest_code(options['email'])
+        if code is None:
+            raise CommandError(
+                f'Писем с кодом на адрес {options["email"]} нет'
+            )
+        self.stdout.write(code)
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from users.models import OtpCode
+
+
+class Command(BaseCommand):
+    """Команда удаления просроченных кодов подтверждения"""
+    help = (
+        'Удаление просроченных кодов подтверждения небольшими пачками, '
+        'каждая в отдельной короткой транзакции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество строк, удаляемых одним запросом',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Пауза между пачками, в секундах, чтобы пропустить запись',
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        started = time.monotonic()
+        now = timezone.now()
+        expired = OtpCode.objects.filter(expired__lte=now)
+        removed = batches = 0
+        while True:
+            ids = list(
+                expired.values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            # У OtpCode нет зависимых моделей и сигналов удаления, поэтому
+            # Django удаляет пачку одним DELETE без выборки объектов.
+            deleted, _ = OtpCode.objects.filter(pk__in=ids).delete()
+            removed += deleted
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Удалено {removed}')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Удалено просроченных кодов: {removed}, пачек: {batches}, '
+                f'за {time.monotonic() - started:.2f} с'
+            )
+        )
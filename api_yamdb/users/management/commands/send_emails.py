@@ -0,0 +1,69 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.outbox import DeliveryStats, dead_emails, drain, queue_size
+
+
+class Command(BaseCommand):
+    """Команда отправки писем из очереди"""
+    help = (
+        'Отправка писем из очереди пачками через одно соединение '
+        'с повтором неудачных попыток'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество писем, выбираемых из очереди за раз',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, проверяя очередь раз в --interval',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза между проверками пустой очереди, в секундах',
+        )
+
+    def report(self, stats: DeliveryStats, started: float) -> None:
+        """Вывод метрик доставки."""
+        elapsed = time.monotonic() - started
+        rate = stats.sent / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Отправлено: {stats.sent}, ошибок с повтором: {stats.failed}, '
+            f'исчерпаны попытки: {stats.dead}, пачек: {stats.batches}, '
+            f'ошибок соединения: {stats.connection_errors}'
+        )
+        self.stdout.write(
+            f'Задержка доставки, с: p50 {stats.percentile(0.5):.1f}, '
+            f'p99 {stats.percentile(0.99):.1f}; '
+            f'скорость: {rate:.1f} писем/с'
+        )
+        self.stdout.write(
+            f'В очереди: {queue_size()}, без доставки после '
+            f'{settings.EMAIL_OUTBOX_MAX_ATTEMPTS} попыток: '
+            f'{dead_emails().count()}'
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Основной метод выполнения команды."""
+        started = time.monotonic()
+        stats = drain(options['batch_size'])
+        while options['loop']:
+            try:
+                time.sleep(options['interval'])
+                batch_stats = drain(options['batch_size'])
+            except KeyboardInterrupt:
+                break
+            active = batch_stats.batches or batch_stats.connection_errors
+            if active and options['verbosity'] > 1:
+                self.report(batch_stats, started)
+            stats.merge(batch_stats)
+        self.report(stats, started)
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newuser',
+            name='otp_nonce',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Увеличивается при использовании кода, гася все выданные.', verbose_name='Счётчик кодов подтверждения'),
+        ),
+    ]
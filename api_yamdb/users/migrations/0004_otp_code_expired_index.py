@@ -0,0 +1,17 @@
+# Generated by Django 5.1.1 on 2026-10-18 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_otp_nonce'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otpcode',
+            index=models.Index(fields=['expired'], name='otp_code_expired_idx'),
+        ),
+    ]
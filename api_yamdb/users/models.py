@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 from .constants import (
     ADMIN_ROLE,
@@ -48,6 +49,13 @@ class NewUser(AbstractUser):
         },
     )
 
+    otp_nonce = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Счётчик кодов подтверждения",
+        help_text="Увеличивается при использовании кода, гася все выданные.",
+    )
+
     @property
     def is_admin(self):
         return self.role == ADMIN_ROLE or self.is_superuser or self.is_staff
@@ -73,3 +81,49 @@ class OtpCode(models.Model):
         auto_now_add=True, verbose_name="Дата создания"
     )
     expired = models.DateTimeField("Дата истечения кода")
+
+    class Meta:
+        indexes = [
+            # Для purge_otp_codes; поиск по email идёт по уникальному индексу.
+            models.Index(fields=("expired",), name="otp_code_expired_idx"),
+        ]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку (outbox).
+
+    Запрос только добавляет строку, письма рассылает команда send_emails.
+    """
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.EmailField(verbose_name="Отправитель")
+    recipient = models.EmailField(verbose_name="Получатель")
+    created_at = models.DateTimeField(
+        auto_now_add=True, verbose_name="Дата создания"
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попыток отправки"
+    )
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Следующая попытка"
+    )
+    sent_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата отправки"
+    )
+    last_error = models.TextField(blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        verbose_name = "Письмо"
+        verbose_name_plural = "Очередь писем"
+        indexes = [
+            # Только неотправленные письма: индекс не растёт с историей.
+            models.Index(
+                fields=("next_attempt_at",),
+                condition=models.Q(sent_at__isnull=True),
+                name="outgoing_email_pending_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient}"
@@ -0,0 +1,59 @@
+import hmac
+import time
+
+from django.conf import settings
+from django.db.models import F
+from django.utils.crypto import salted_hmac
+
+CODE_DIGITS = 6
+
+
+def current_window(now=None) -> int:
+    """Номер интервала OTP_WINDOW, в котором находится момент `now`."""
+    if now is None:
+        now = time.time()
+    return int(now // settings.OTP_WINDOW.total_seconds())
+
+
+def make_code(user, window=None) -> str:
+    """
+    Код подтверждения из HMAC от id пользователя, счётчика и интервала.
+
+    Код не хранится: его можно вычислить заново при проверке.
+    """
+    if window is None:
+        window = current_window()
+    digest = salted_hmac(
+        "users.otp",
+        f"{user.pk}:{user.otp_nonce}:{window}",
+        algorithm="sha256",
+    ).digest()
+    # Динамическое усечение, как в HOTP (RFC 4226).
+    offset = digest[-1] & 0x0F
+    value = int.from_bytes(digest[offset:offset + 4], "big") & 0x7FFFFFFF
+    return f"{value % 10 ** CODE_DIGITS:0{CODE_DIGITS}d}"
+
+
+def check_code(user, code) -> bool:
+    """Код выдан пользователю не раньше чем OTP_LIFETIME назад."""
+    window = current_window()
+    windows = int(settings.OTP_LIFETIME / settings.OTP_WINDOW)
+    return any(
+        hmac.compare_digest(make_code(user, window - shift), str(code))
+        for shift in range(windows)
+    )
+
+
+def consume_code(user) -> bool:
+    """
+    Погашение всех выданных кодов сменой счётчика пользователя.
+
+    False, если код уже погашен параллельным запросом. update() не
+    отправляет post_save, поэтому копии пользователя в кэшах сбрасывает
+    вызывающий код.
+    """
+    return bool(
+        type(user)
+        .objects.filter(pk=user.pk, otp_nonce=user.otp_nonce)
+        .update(otp_nonce=F("otp_nonce") + 1)
+    )
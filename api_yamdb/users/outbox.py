@@ -0,0 +1,191 @@
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import OutgoingEmail
+
+
+@dataclass
+class DeliveryStats:
+    """Метрики доставки писем за время работы отправителя."""
+
+    sent: int = 0
+    failed: int = 0
+    dead: int = 0
+    batches: int = 0
+    # Сколько раз не удалось открыть соединение с почтовым сервером.
+    connection_errors: int = 0
+    # Задержки доставки (от постановки в очередь до отправки), в секундах.
+    delays: list = field(default_factory=list)
+
+    def merge(self, other):
+        self.sent += other.sent
+        self.failed += other.failed
+        self.dead += other.dead
+        self.batches += other.batches
+        self.connection_errors += other.connection_errors
+        self.delays.extend(other.delays)
+
+    def percentile(self, share):
+        if not self.delays:
+            return 0
+        delays = sorted(self.delays)
+        return delays[min(len(delays) - 1, int(len(delays) * share))]
+
+
+def enqueue_email(subject, body, recipient, from_email=None):
+    """Постановка письма в очередь; отправка — командой send_emails."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        recipient=recipient,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def pending_emails():
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
+
+
+def claim_batch(size):
+    """
+    Выбор готовых к отправке писем с арендой на EMAIL_OUTBOX_LEASE секунд.
+
+    Письмо достаётся отправителю, только если его условный UPDATE
+    (срок ещё не сдвинут другим отправителем) изменил строку: на SQLite
+    select_for_update не блокирует строки. Пока аренда не истекла, письма
+    не достанутся другому отправителю; если отправитель упал, письма
+    вернутся в очередь по её истечении.
+    """
+    now = timezone.now()
+    lease = now + timezone.timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+    candidates = (
+        pending_emails()
+        .filter(next_attempt_at__lte=now)
+        .order_by("next_attempt_at")[:size]
+    )
+    batch = []
+    with transaction.atomic():
+        for email in candidates:
+            claimed = OutgoingEmail.objects.filter(
+                pk=email.pk, sent_at__isnull=True, next_attempt_at__lte=now
+            ).update(next_attempt_at=lease)
+            if claimed:
+                batch.append(email)
+    return batch
+
+
+def release(emails):
+    """Возврат писем в очередь без траты попытки."""
+    OutgoingEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        next_attempt_at=timezone.now()
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед следующей попыткой."""
+    return timezone.timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def deliver(batch, connection):
+    """
+    Отправка пачки писем через одно открытое соединение.
+
+    После ошибки соединение открывается заново: SMTP-бэкенд Django
+    не замечает оборванного сокета. Если сервер недоступен, оставшиеся
+    письма возвращаются в очередь, не тратя попыток.
+    """
+    stats = DeliveryStats(batches=1)
+    sent = []
+    reconnect = False
+    for index, email in enumerate(batch):
+        if reconnect:
+            try:
+                connection.close()
+                connection.open()
+            except Exception:
+                stats.connection_errors += 1
+                release(batch[index:])
+                break
+            reconnect = False
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.body,
+            from_email=email.from_email,
+            to=[email.recipient],
+            connection=connection,
+        )
+        try:
+            message.send()
+        except Exception as error:
+            attempts = email.attempts + 1
+            OutgoingEmail.objects.filter(pk=email.pk).update(
+                attempts=F("attempts") + 1,
+                next_attempt_at=timezone.now() + retry_delay(attempts),
+                last_error=f"{type(error).__name__}: {error}",
+            )
+            if attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+                stats.dead += 1
+            else:
+                stats.failed += 1
+            reconnect = True
+            continue
+        sent.append(email)
+
+    now = timezone.now()
+    OutgoingEmail.objects.filter(pk__in=[email.pk for email in sent]).update(
+        sent_at=now, attempts=F("attempts") + 1, last_error=""
+    )
+    stats.sent = len(sent)
+    stats.delays = [
+        (now - email.created_at).total_seconds() for email in sent
+    ]
+    return stats
+
+
+def drain(batch_size):
+    """
+    Отправка всех готовых писем пачками через одно соединение.
+
+    Если почтовый сервер недоступен, отправка прекращается до следующего
+    запуска: письма остаются в очереди.
+    """
+    stats = DeliveryStats()
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        stats.connection_errors += 1
+        return stats
+    try:
+        while batch := claim_batch(batch_size):
+            batch_stats = deliver(batch, connection)
+            stats.merge(batch_stats)
+            if batch_stats.connection_errors:
+                break
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return stats
+
+
+def queue_size():
+    return pending_emails().count()
+
+
+def dead_emails():
+    return OutgoingEmail.objects.filter(
+        sent_at__isnull=True,
+        attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+    )
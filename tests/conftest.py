@@ -26,5 +26,7 @@ if FILENAME not in project_dir_content:
     )
 
 pytest_plugins = [
+    "tests.fixtures.fixture_cache",
+    "tests.fixtures.fixture_data",
     "tests.fixtures.fixture_user",
 ]
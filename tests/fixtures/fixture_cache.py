@@ -0,0 +1,21 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from api.cache import cached_users, known_parents
+from reviews.catalog import clear_catalog
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    caches[settings.THROTTLE_CACHE].clear()
+    caches[settings.SHARED_CACHE].clear()
+    known_parents.clear()
+    cached_users.clear()
+    clear_catalog()
+    yield
+    cache.clear()
+    known_parents.clear()
+    cached_users.clear()
+    clear_catalog()
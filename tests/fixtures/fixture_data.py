@@ -0,0 +1,46 @@
+import pytest
+
+from reviews.catalog import load_catalog
+from reviews.models import Category, Comment, Genre, Review, Title
+
+
+@pytest.fixture
+def many_titles():
+    category = Category.objects.create(name="Фильм", slug="films")
+    genres = [
+        Genre.objects.create(name="Ужасы", slug="horror"),
+        Genre.objects.create(name="Комедия", slug="comedy"),
+    ]
+    titles = [
+        Title.objects.create(
+            name=f"Произведение {idx % 7}", year=2000, category=category
+        )
+        for idx in range(30)
+    ]
+    for title in titles:
+        title.genre.set(genres)
+    # Снимок справочников в процессе уже загружен, как в рабочем режиме.
+    load_catalog()
+    return titles
+
+
+@pytest.fixture
+def many_reviews(django_user_model, many_titles):
+    title = many_titles[0]
+    authors = [
+        django_user_model.objects.create(
+            username=f"author{idx}", email=f"author{idx}@yamdb.fake"
+        )
+        for idx in range(12)
+    ]
+    reviews = [
+        Review.objects.create(
+            title=title, author=author, text=f"Отзыв {idx}", score=5
+        )
+        for idx, author in enumerate(authors)
+    ]
+    for idx, author in enumerate(authors):
+        Comment.objects.create(
+            review=reviews[0], author=author, text=f"Комментарий {idx}"
+        )
+    return title, reviews
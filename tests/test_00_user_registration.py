@@ -1,14 +1,21 @@
 from http import HTTPStatus
+from io import StringIO
 
 import pytest
 from django.core import mail
+from django.core.management import call_command
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
 
 from tests.utils import (
     invalid_data_for_user_patch_and_creation,
     invalid_data_for_username_and_email_fields,
 )
 
+from api.serializers import UserSerializer
+
 
 @pytest.mark.django_db(transaction=True)
 class Test00UserRegistration:
@@ -109,6 +116,8 @@ class Test00UserRegistration:
         }
 
         response = client.post(self.URL_SIGNUP, data=valid_data)
+        # Письма из очереди отправляет отдельная команда.
+        call_command("send_emails", stdout=StringIO())
         outbox_after = mail.outbox  # email outbox after user create
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
@@ -158,6 +167,7 @@ class Test00UserRegistration:
         response = admin_client.post(
             self.URL_ADMIN_CREATE_USER, data=valid_data
         )
+        call_command("send_emails", stdout=StringIO())
         outbox_after = mail.outbox
 
         assert response.status_code != HTTPStatus.NOT_FOUND, (
@@ -363,3 +373,39 @@ class Test00UserRegistration:
             "пользователя, созданного администратором,  возвращает ответ "
             "со статусом 200."
         )
+
+    def test_signup_query_count(self, client, django_user_model):
+        data = {"username": "newcomer", "email": "newcomer@yamdb.fake"}
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as context:
+                response = client.post("/api/v1/auth/signup/", data=data)
+            assert response.status_code == HTTPStatus.OK
+            lookups = [
+                query["sql"]
+                for query in context.captured_queries
+                if query["sql"].startswith("SELECT")
+            ]
+            assert len(lookups) == 1, (
+                "Проверьте, что регистрация ищет занятые username и email "
+                "одним запросом."
+            )
+        assert django_user_model.objects.filter(**data).count() == 1
+
+    def test_signup_race(self, django_user_model):
+        django_user_model.objects.create(
+            username="first", email="first@yamdb.fake"
+        )
+        serializer = UserSerializer()
+        # Проверка прошла до того, как параллельный запрос создал запись.
+        serializer.user = None
+        user = serializer.create(
+            {"username": "first", "email": "first@yamdb.fake"}
+        )
+        assert user.username == "first"
+        with pytest.raises(ValidationError) as error:
+            serializer.create(
+                {"username": "second", "email": "first@yamdb.fake"}
+            )
+        assert error.value.detail == {
+            "email": ["Введённый email уже занят."]
+        }
@@ -570,3 +570,38 @@ class Test01UserAPI:
             f"Проверьте, что PATCH-запрос к `{self.USERS_ME_URL}` с ключом "
             "`role` не изменяет роль пользователя."
         )
+
+    def test_11_users_without_count(self, admin_client, admin):
+        response = admin_client.get("/api/v1/users/", {"count": "false"})
+        data = response.json()
+        assert response.status_code == HTTPStatus.OK
+        assert data["count"] is None
+        assert [user["username"] for user in data["results"]] == [
+            admin.username
+        ]
+        assert data["next"] is None
+        response = admin_client.get(
+            "/api/v1/users/", {"count": "false", "page": 2}
+        )
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_12_demoted_admin(self, admin, admin_client, django_user_model):
+        url = "/api/v1/users/me/"
+        # Запрос на запись кладёт пользователя в кэш процесса.
+        response = admin_client.delete("/api/v1/genres/missing/")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+        # Роль меняют в другом процессе: кэш этого процесса не сброшен.
+        django_user_model.objects.filter(pk=admin.pk).update(role="user")
+
+        response = admin_client.patch(url, data={"bio": "Второе"})
+        assert response.status_code == HTTPStatus.OK
+        admin.refresh_from_db()
+        assert (admin.role, admin.bio) == ("user", "Второе"), (
+            "Проверьте, что PATCH `/api/v1/users/me/` не сохраняет "
+            "закэшированную копию пользователя."
+        )
+        response = admin_client.get("/api/v1/users/")
+        assert response.status_code == HTTPStatus.FORBIDDEN, (
+            "Проверьте, что доступ к `/api/v1/users/` проверяется по роли "
+            "в базе, а не в токене."
+        )
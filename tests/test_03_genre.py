@@ -1,6 +1,10 @@
 from http import HTTPStatus
 
 import pytest
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_name_and_slug_patterns,
@@ -9,6 +13,10 @@ from tests.utils import (
     create_genre,
 )
 
+from api.cache import TABLE_VERSION_KEY, bump_table_version
+from reviews.catalog import bump_catalog_version
+from reviews.models import Genre
+
 
 @pytest.mark.django_db(transaction=True)
 class Test03GenreAPI:
@@ -150,3 +158,58 @@ class Test03GenreAPI:
             genres,
             HTTPStatus.FORBIDDEN,
         )
+
+    def test_06_genres_unicode_search(self, client, many_titles):
+        response = client.get("/api/v1/genres/", {"search": "УЖАС"})
+        assert [genre["slug"] for genre in response.json()["results"]] == [
+            "horror"
+        ]
+
+    def test_07_anonymous_page_cache(self, client, user_client, many_titles):
+        url = "/api/v1/genres/"
+        response = client.get(url)
+        assert "max-age=300" in response.headers["Cache-Control"]
+        assert "Authorization" in response.headers["Vary"]
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert not context.captured_queries, (
+            "Проверьте, что анонимный GET-запрос к `/api/v1/genres/` "
+            "отдаётся из кэша страниц."
+        )
+
+        response = user_client.get(url)
+        assert "Cache-Control" not in response.headers
+        assert "Authorization" in response.headers["Vary"]
+        with CaptureQueriesContext(connection) as context:
+            user_client.get(url)
+        assert context.captured_queries, (
+            "Проверьте, что запросы с токеном проходят мимо кэша страниц."
+        )
+
+        genre = Genre.objects.get(slug="horror")
+        genre.name = "Хоррор"
+        genre.save()
+        assert "Хоррор" in client.get(url).content.decode(), (
+            "Проверьте, что запись в каталог сбрасывает кэш страниц."
+        )
+
+    def test_08_versions_are_shared(self, user_client, many_titles):
+        url = "/api/v1/genres/"
+        etag = user_client.get(url).headers["ETag"]
+        # Запись в другом процессе видна через общий кэш версий и версию
+        # справочников в базе, а не через кэш этого процесса.
+        Genre.objects.filter(slug="horror").update(name="Хоррор")
+        bump_catalog_version()
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что ETag списка жанров учитывает версию справочников."
+        )
+        assert "Хоррор" in response.content.decode()
+
+        etag = response.headers["ETag"]
+        bump_table_version(Genre._meta.db_table)
+        key = TABLE_VERSION_KEY.format(Genre._meta.db_table)
+        assert caches[settings.SHARED_CACHE].get(key) is not None
+        assert cache.get(key) is None
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == HTTPStatus.OK
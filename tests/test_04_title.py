@@ -1,15 +1,25 @@
+import threading
 from http import HTTPStatus
 
 import pytest
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from tests.utils import (
     check_pagination,
     check_permissions,
+    check_query_count,
     create_categories,
     create_genre,
     create_titles,
 )
 
+from api.cache import LOCK_KEY, get_or_compute
+from reviews.catalog import bump_catalog_version
+from reviews.models import Category, Genre, Title
+
 
 @pytest.mark.django_db(transaction=True)
 class Test04TitleAPI:
@@ -373,3 +383,199 @@ class Test04TitleAPI:
             f"Проверьте, что PUT-запрос к `{self.TITLES_DETAIL_URL_TEMPLATE} "
             "не предусмотрен и возвращает статус 405."
         )
+
+    def test_07_titles_list_query_count(self, client, many_titles):
+        # Оценка по статистике и COUNT для пагинации (при холодном кэше),
+        # произведения, id их жанров, версия справочников.
+        check_query_count(client, self.TITLES_URL, 5)
+
+    def test_08_title_detail_query_count(self, client, many_titles):
+        url = f"{self.TITLES_URL}{many_titles[0].id}/"
+        check_query_count(client, url, 3, limits=(None,))
+
+    def test_09_titles_cursor_pagination(self, client, many_titles):
+        expected = [
+            title.id
+            for title in sorted(
+                many_titles, key=lambda title: (title.name_key, title.id)
+            )
+        ]
+        url = f"{self.TITLES_URL}?cursor=&limit=4"
+        received = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert "count" not in data, (
+                "В режиме курсора ответ не должен содержать `count`."
+            )
+            # Произведения, id жанров и версия справочников, без COUNT
+            # и OFFSET.
+            assert len(context.captured_queries) == 3
+            received.extend(title["id"] for title in data["results"])
+            previous, url = data["previous"], data["next"]
+        assert received == expected, (
+            "Проверьте, что курсорная пагинация отдаёт все произведения "
+            "по порядку названия без пропусков и повторов."
+        )
+
+        response = client.get(previous)
+        assert [title["id"] for title in response.json()["results"]] == (
+            expected[-6:-2]
+        )
+
+    def test_10_titles_invalid_cursor(self, client, many_titles):
+        response = client.get(f"{self.TITLES_URL}?cursor=broken")
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+    def test_11_titles_count_is_cached(self, client, many_titles):
+        client.get(self.TITLES_URL)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.TITLES_URL, {"offset": 10})
+        assert response.json()["count"] == len(many_titles)
+        assert len(context.captured_queries) == 3, (
+            "Проверьте, что повторный запрос списка берёт `count` из кэша."
+        )
+
+        category = Category.objects.get()
+        Title.objects.create(name="Новое", year=2000, category=category)
+        response = client.get(self.TITLES_URL)
+        assert response.json()["count"] == len(many_titles) + 1, (
+            "Проверьте, что запись в таблицу сбрасывает закэшированный "
+            "`count`."
+        )
+
+    def test_12_titles_without_count(self, client, many_titles):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                self.TITLES_URL, {"count": "false", "offset": 15}
+            )
+        data = response.json()
+        assert data["count"] is None
+        assert len(data["results"]) == 10
+        assert data["next"] is not None
+        assert len(context.captured_queries) == 3
+
+        data = client.get(
+            self.TITLES_URL, {"count": "false", "offset": 25}
+        ).json()
+        assert len(data["results"]) == 5
+        assert data["next"] is None
+
+    def test_13_titles_unicode_name_search(self, client, many_titles):
+        category = Category.objects.get()
+        title = Title.objects.create(
+            name="Ёжик в тумане", year=1975, category=category
+        )
+        for params in (
+            {"name": "ЁЖИК"},
+            {"name": "в Тумане"},
+            {"name_prefix": "ежик"},
+        ):
+            response = client.get(self.TITLES_URL, params)
+            assert [item["id"] for item in response.json()["results"]] == [
+                title.id
+            ], (
+                "Проверьте, что поиск по названию произведения не зависит "
+                f"от регистра кириллицы: {params}."
+            )
+
+    def test_14_titles_response_cache(self, client, user_client, many_titles):
+        title = many_titles[0]
+        detail_url = f"{self.TITLES_URL}{title.id}/"
+        params = {"genre": "horror", "year": 2000}
+        for url, query in ((self.TITLES_URL, params), (detail_url, {})):
+            client.get(url, query)
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url, dict(reversed(query.items())))
+            assert response.status_code == HTTPStatus.OK
+            assert not context.captured_queries, (
+                f"Проверьте, что повторный запрос к `{url}` с теми же "
+                "параметрами отдаётся из кэша."
+            )
+
+        response = user_client.post(
+            f"{detail_url}reviews/", data={"text": "Отзыв", "score": 7}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        assert client.get(detail_url).json()["rating"] == 7, (
+            "Проверьте, что новый отзыв сбрасывает кэш карточки произведения."
+        )
+        ratings = {
+            item["id"]: item["rating"]
+            for item in client.get(self.TITLES_URL, params).json()["results"]
+        }
+        assert ratings[title.id] == 7
+
+        other_url = f"{self.TITLES_URL}{many_titles[1].id}/"
+        client.get(other_url)
+        with CaptureQueriesContext(connection) as context:
+            client.get(other_url)
+        assert not context.captured_queries, (
+            "Проверьте, что отзыв сбрасывает кэш только своего произведения."
+        )
+
+        Genre.objects.get(slug="horror").delete()
+        data = client.get(detail_url).json()
+        assert [genre["slug"] for genre in data["genre"]] == ["comedy"]
+
+    def test_15_catalog_snapshot(self, client, admin_client, many_titles):
+        with CaptureQueriesContext(connection) as context:
+            response = admin_client.post(
+                self.TITLES_URL,
+                data={
+                    "name": "Новое",
+                    "year": 2000,
+                    "genre": ["horror", "comedy"],
+                    "category": "films",
+                },
+            )
+        assert response.status_code == HTTPStatus.CREATED
+        assert not [
+            query
+            for query in context.captured_queries
+            if '"slug" =' in query["sql"]
+        ], "Проверьте, что slug жанров и категорий ищутся в снимке."
+
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(
+                "/api/v1/categories/", {"search": "ФИЛ"}
+            )
+        assert [item["slug"] for item in response.json()["results"]] == [
+            "films"
+        ]
+        assert len(context.captured_queries) == 1, (
+            "Проверьте, что список категорий отдаётся из снимка, "
+            "со сверкой версии справочников."
+        )
+
+        # Карточка попадает в кэш ответов; запросы с токеном проходят
+        # мимо кэша страниц.
+        detail_url = f"{self.TITLES_URL}{many_titles[0].id}/"
+        admin_client.get(detail_url)
+        # Запись в другом процессе: сигналы этого процесса не срабатывают,
+        # но версия в базе меняется.
+        Genre.objects.filter(slug="horror").update(name="Хоррор")
+        bump_catalog_version()
+        data = admin_client.get(detail_url).json()
+        assert {"name": "Хоррор", "slug": "horror"} in data["genre"], (
+            "Проверьте, что процесс перечитывает снимок справочников "
+            "после смены версии в базе, а кэш ответов учитывает её."
+        )
+        response = client.get(self.TITLES_URL, {"genre": "nothing"})
+        assert response.json()["results"] == []
+
+
+def test_get_or_compute_waits_for_running_computation():
+    key = "stampede-test"
+    shared = caches[settings.SHARED_CACHE]
+    shared.add(LOCK_KEY.format(key), 1, 5)
+    timer = threading.Timer(0.1, shared.set, (key, "готово"))
+    timer.start()
+
+    def compute():
+        raise AssertionError("Холодный ключ уже считает другой процесс.")
+
+    assert get_or_compute(key, compute, 60) == "готово"
+    timer.join()
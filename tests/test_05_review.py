@@ -1,7 +1,13 @@
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
 
 from tests.utils import (
     check_fields,
@@ -11,6 +17,11 @@ from tests.utils import (
     create_titles,
 )
 
+from api.authentication import RoleAccessToken
+from api.serializers import ReviewSerializer
+from reviews.models import Comment, Review, Title
+from reviews.ratings import find_rating_drift
+
 
 @pytest.mark.django_db(transaction=True)
 class Test05ReviewAPI:
@@ -445,3 +456,345 @@ class Test05ReviewAPI:
             f"Проверьте, что PUT-запрос к `{self.REVIEW_DETAIL_URL_TEMPLATE} "
             "не предусмотрен и возвращает статус 405."
         )
+
+    def test_07_review_put_mine(self, admin_client, user_client, user):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]["id"])
+        mine_url = f"{url}mine/"
+        response = user_client.put(
+            mine_url,
+            data={"text": "Первый отзыв", "score": 4},
+            format="json",
+        )
+        assert response.status_code == HTTPStatus.OK, (
+            f"Проверьте, что PUT-запрос к `{mine_url}` создаёт отзыв "
+            "текущего пользователя."
+        )
+        review_id = response.json()["id"]
+        response = user_client.put(
+            mine_url,
+            data={"text": "Новый отзыв", "score": 8},
+            format="json",
+        )
+        data = response.json()
+        assert response.status_code == HTTPStatus.OK
+        assert data["id"] == review_id, (
+            f"Проверьте, что повторный PUT-запрос к `{mine_url}` заменяет "
+            "отзыв, а не создаёт новый."
+        )
+        assert (data["text"], data["score"], data["author"]) == (
+            "Новый отзыв",
+            8,
+            user.username,
+        )
+        title = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=titles[0]["id"])
+        ).json()
+        assert title["rating"] == 8
+
+        response = user_client.post(url, data={"text": "Ещё", "score": 1})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+        assert response.json() == {
+            "non_field_errors": ["Вы уже писали отзыв!"]
+        }
+
+        response = user_client.put(mine_url, data={"score": 11})
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_08_rating_aggregates(
+        self, admin_client, user_client, moderator_client
+    ):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]["id"]
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+
+        def aggregates():
+            title = Title.objects.get(pk=title_id)
+            return title.rating_sum, title.rating_count
+
+        response = user_client.post(url, data={"text": "Отзыв", "score": 4})
+        assert response.status_code == HTTPStatus.CREATED
+        review_id = response.json()["id"]
+        moderator_client.post(url, data={"text": "Отзыв", "score": 10})
+        assert aggregates() == (14, 2), (
+            "Проверьте, что создание отзыва сдвигает `rating_sum` и "
+            "`rating_count` произведения."
+        )
+
+        detail_url = self.REVIEW_DETAIL_URL_TEMPLATE.format(
+            title_id=title_id, review_id=review_id
+        )
+        response = user_client.patch(detail_url, data={"score": 7})
+        assert response.status_code == HTTPStatus.OK
+        assert aggregates() == (17, 2), (
+            "Проверьте, что изменение оценки отзыва сдвигает только "
+            "`rating_sum` произведения."
+        )
+        user_client.patch(detail_url, data={"text": "Без оценки"})
+        assert aggregates() == (17, 2)
+
+        response = user_client.delete(detail_url)
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert aggregates() == (10, 1), (
+            "Проверьте, что удаление отзыва вычитает его оценку из "
+            "агрегатов произведения."
+        )
+        title = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        ).json()
+        assert title["rating"] == 10
+
+    def test_09_rebuild_ratings(self, admin_client, user_client):
+        titles, _, _ = create_titles(admin_client)
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=titles[0]["id"])
+        user_client.post(url, data={"text": "Отзыв", "score": 6})
+        call_command("rebuild_ratings", check=True)
+
+        Title.objects.update(rating_sum=999, rating_count=5)
+        with pytest.raises(CommandError):
+            call_command("rebuild_ratings", check=True)
+        assert Title.objects.filter(rating_sum=999).count() == len(titles)
+
+        call_command("rebuild_ratings")
+        assert Title.objects.get(pk=titles[0]["id"]).rating_sum == 6
+        assert not Title.objects.exclude(pk=titles[0]["id"]).exclude(
+            rating_sum=0, rating_count=0
+        ).exists()
+        call_command("rebuild_ratings", check=True)
+
+    def test_10_rating_follows_cascades(
+        self, admin_client, user_client, user, moderator_client, moderator
+    ):
+        titles, _, _ = create_titles(admin_client)
+        title_id = titles[0]["id"]
+        url = self.REVIEWS_URL_TEMPLATE.format(title_id=title_id)
+        user_client.post(url, data={"text": "Отзыв", "score": 9})
+        moderator_client.post(url, data={"text": "Отзыв", "score": 3})
+
+        review = Review.objects.get(author=moderator)
+        review.score = 5
+        review.title_id = titles[1]["id"]
+        review.save()
+        assert list(find_rating_drift()) == [], (
+            "Проверьте, что изменение отзыва вне API тоже сдвигает "
+            "агрегаты рейтинга."
+        )
+
+        response = admin_client.delete(f"/api/v1/users/{user.username}/")
+        assert response.status_code == HTTPStatus.NO_CONTENT
+        assert list(find_rating_drift()) == [], (
+            "Проверьте, что каскадное удаление отзывов вместе с автором "
+            "вычитает их оценки из агрегатов произведения."
+        )
+        title = admin_client.get(
+            self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title_id)
+        ).json()
+        assert title["rating"] is None
+
+    def test_11_review_integrity_errors(self, admin_client, user):
+        titles, _, _ = create_titles(admin_client)
+
+        def save(title_id):
+            serializer = ReviewSerializer(data={"text": "Отзыв", "score": 5})
+            assert serializer.is_valid()
+            return serializer.save(author=user, title_id=title_id)
+
+        save(titles[0]["id"])
+        with pytest.raises(ValidationError):
+            save(titles[0]["id"])
+        with pytest.raises(IntegrityError):
+            # Нарушение внешнего ключа не выдаётся за повторный отзыв.
+            save(10**6)
+
+    @pytest.mark.parametrize(
+        "url_template",
+        (
+            "/api/v1/titles/{title_id}/reviews/",
+            "/api/v1/titles/{title_id}/reviews/{review_id}/comments/",
+        ),
+    )
+    def test_12_reviews_and_comments_query_count(
+        self, client, many_reviews, url_template
+    ):
+        title, reviews = many_reviews
+        url = url_template.format(title_id=title.id, review_id=reviews[0].id)
+        # Проверка родителя, COUNT и страница вместе с авторами; на второй
+        # странице родитель и COUNT уже в кэше.
+        for page, expected in ((1, 3), (2, 1)):
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url, {"page": page})
+            assert response.status_code == HTTPStatus.OK
+            assert len(response.json()["results"]) > 1
+            assert len(context.captured_queries) == expected, (
+                f"Проверьте, что GET-запрос к `{url_template}` загружает "
+                "авторов в основном запросе, без отдельного запроса на "
+                "каждый объект."
+            )
+
+    def test_13_nested_parent_chain(self, user_client, many_reviews):
+        title, reviews = many_reviews
+        other = Title.objects.exclude(pk=title.pk).first()
+        url = f"/api/v1/titles/{other.id}/reviews/{reviews[0].id}/comments/"
+        assert user_client.get(url).status_code == HTTPStatus.NOT_FOUND
+        response = user_client.post(url, {"text": "Комментарий"})
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+        url = f"/api/v1/titles/{title.id}/reviews/"
+        assert user_client.get(url).status_code == HTTPStatus.OK
+        title.delete()
+        assert user_client.get(url).status_code == HTTPStatus.NOT_FOUND, (
+            "Проверьте, что удаление произведения сбрасывает кэш известных "
+            "родительских объектов."
+        )
+
+    @pytest.mark.parametrize(
+        "url_template,ordering",
+        (
+            ("/api/v1/titles/{title_id}/reviews/", ("-pub_date", "-id")),
+            (
+                "/api/v1/titles/{title_id}/reviews/{review_id}/comments/",
+                ("pub_date", "id"),
+            ),
+        ),
+    )
+    def test_14_reviews_and_comments_cursor(
+        self, client, many_reviews, url_template, ordering
+    ):
+        title, reviews = many_reviews
+        queryset = (
+            Review.objects.filter(title=title)
+            if "comments" not in url_template
+            else Comment.objects.filter(review=reviews[0])
+        )
+        expected = list(
+            queryset.order_by(*ordering).values_list("id", flat=True)
+        )
+        url = url_template.format(title_id=title.id, review_id=reviews[0].id)
+        url = f"{url}?cursor="
+        received = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = client.get(url)
+            assert response.status_code == HTTPStatus.OK
+            data = response.json()
+            assert "count" not in data
+            # Без COUNT: проверка родителя (только на первой странице)
+            # и страница вместе с авторами.
+            assert len(context.captured_queries) <= 2
+            received.extend(item["id"] for item in data["results"])
+            url = data["next"]
+        assert received == expected, (
+            f"Проверьте, что курсорная пагинация `{url_template}` отдаёт "
+            "все объекты по порядку без пропусков и повторов."
+        )
+
+    def test_15_claims_authentication(self, admin_client, many_reviews):
+        title, reviews = many_reviews
+        author = reviews[1].author
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RoleAccessToken.for_user(author)}"
+        )
+        users_table = author._meta.db_table
+
+        def user_queries(method, url, **kwargs):
+            with CaptureQueriesContext(connection) as context:
+                response = getattr(client, method)(url, **kwargs)
+            return response, [
+                query["sql"]
+                for query in context.captured_queries
+                if f'FROM "{users_table}" WHERE' in query["sql"]
+            ]
+
+        url = f"/api/v1/titles/{title.id}/reviews/"
+        response, queries = user_queries("get", url)
+        assert response.status_code == HTTPStatus.OK
+        assert not queries, (
+            "Проверьте, что запрос на чтение авторизуется по утверждениям "
+            "токена без запроса к таблице пользователей."
+        )
+
+        detail_url = f"{url}{reviews[0].id}/"
+        response, queries = user_queries(
+            "patch", detail_url, data={"text": "Чужой"}
+        )
+        assert response.status_code == HTTPStatus.FORBIDDEN
+        assert len(queries) == 1
+        response, queries = user_queries(
+            "patch", detail_url, data={"text": "Чужой"}
+        )
+        assert not queries, (
+            "Проверьте, что пользователь для запросов на запись берётся "
+            "из кэша процесса."
+        )
+
+        response = admin_client.patch(
+            f"/api/v1/users/{author.username}/", data={"role": "moderator"}
+        )
+        assert response.status_code == HTTPStatus.OK
+        response, _ = user_queries("patch", detail_url, data={"text": "Мод"})
+        assert response.status_code == HTTPStatus.OK, (
+            "Проверьте, что смена роли через `/api/v1/users/` сбрасывает "
+            "закэшированного пользователя."
+        )
+
+    def test_16_conditional_get(self, user_client, many_reviews):
+        # Аутентифицированные запросы проходят мимо кэша страниц
+        # и проверяют ETag в ConditionalGetMixin.
+        title, reviews = many_reviews
+        reviews_url = self.REVIEWS_URL_TEMPLATE.format(title_id=title.id)
+        review_url = f"{reviews_url}{reviews[0].id}/"
+        comments_url = f"{review_url}comments/"
+        title_url = self.TITLE_DETAIL_URL_TEMPLATE.format(title_id=title.id)
+        # Для произведений и справочников ETag включает версию
+        # справочников из базы: один запрос по первичному ключу.
+        query_budget = {
+            title_url: 1,
+            reviews_url: 0,
+            review_url: 0,
+            comments_url: 0,
+            "/api/v1/genres/": 1,
+        }
+        etags = {}
+        for url, budget in query_budget.items():
+            response = user_client.get(url)
+            etags[url] = response.headers.get("ETag")
+            assert etags[url], f"Проверьте, что ответ `{url}` содержит ETag."
+            with CaptureQueriesContext(connection) as context:
+                response = user_client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            assert response.status_code == HTTPStatus.NOT_MODIFIED, (
+                f"Проверьте, что `{url}` с совпавшим If-None-Match "
+                "возвращает 304."
+            )
+            assert not response.content
+            assert response.headers["ETag"] == etags[url]
+            assert len(context.captured_queries) == budget, (
+                f"Проверьте, что 304 для `{url}` стоит не больше {budget} "
+                "запросов к базе."
+            )
+            assert user_client.get(url).headers["ETag"] == etags[url], (
+                f"Проверьте, что ETag `{url}` не меняется без записи."
+            )
+
+        response = user_client.post(comments_url, data={"text": "Новый"})
+        assert response.status_code == HTTPStatus.CREATED
+        changed = {
+            url
+            for url in query_budget
+            if user_client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code
+            == HTTPStatus.OK
+        }
+        assert changed == {review_url, comments_url}, (
+            "Проверьте, что комментарий меняет ETag только отзыва "
+            "и списка его комментариев."
+        )
+
+        response = user_client.post(
+            reviews_url, data={"text": "Отзыв", "score": 1}
+        )
+        assert response.status_code == HTTPStatus.CREATED
+        response = user_client.get(
+            reviews_url, HTTP_IF_NONE_MATCH=etags[reviews_url]
+        )
+        assert response.status_code == HTTPStatus.OK
+        assert response.headers["ETag"] != etags[reviews_url]
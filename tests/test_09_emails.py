@@ -0,0 +1,183 @@
+import smtplib
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.utils import timezone
+
+from users.maillog import MailLog, latest_code
+from users.models import OutgoingEmail
+from users.outbox import claim_batch
+
+
+class FlakyBackend(EmailBackend):
+    """Соединение обрывается после каждого второго письма."""
+
+    def open(self):
+        self.alive = True
+        self.count = 0
+        return True
+
+    def close(self):
+        self.alive = False
+
+    def send_messages(self, messages):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected("Соединение закрыто")
+        self.count += 1
+        if self.count % 2 == 0:
+            self.alive = False
+        return super().send_messages(messages)
+
+
+class DownBackend(EmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("SMTP недоступен")
+
+
+def send_emails():
+    out = StringIO()
+    call_command("send_emails", batch_size=2, stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test09EmailOutbox:
+
+    URL_SIGNUP = "/api/v1/auth/signup/"
+
+    def signup(self, client, count):
+        for idx in range(count):
+            response = client.post(
+                self.URL_SIGNUP,
+                data={
+                    "email": f"user{idx}@yamdb.fake",
+                    "username": f"user{idx}",
+                },
+            )
+            assert response.status_code == HTTPStatus.OK
+
+    def test_01_signup_does_not_send_mail(self, client):
+        self.signup(client, 5)
+        assert len(mail.outbox) == 0, (
+            "Проверьте, что регистрация только ставит письмо в очередь."
+        )
+        assert OutgoingEmail.objects.filter(sent_at=None).count() == 5
+
+        output = send_emails()
+        assert sorted(message.to[0] for message in mail.outbox) == [
+            f"user{idx}@yamdb.fake" for idx in range(5)
+        ]
+        assert not OutgoingEmail.objects.filter(sent_at=None).exists()
+        assert "Отправлено: 5" in output
+        assert "пачек: 3" in output
+
+        send_emails()
+        assert len(mail.outbox) == 5, "Письмо не должно уходить повторно."
+
+    def test_02_failed_mail_is_retried_with_backoff(
+        self, client, monkeypatch, settings
+    ):
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        self.signup(client, 1)
+
+        def fail(backend, messages):
+            raise ConnectionError("SMTP недоступен")
+
+        monkeypatch.setattr(EmailBackend, "send_messages", fail)
+        output = send_emails()
+        email = OutgoingEmail.objects.get()
+        assert "ошибок с повтором: 1" in output
+        assert email.attempts == 1
+        assert email.sent_at is None
+        assert "SMTP недоступен" in email.last_error
+        delay = (email.next_attempt_at - timezone.now()).total_seconds()
+        assert 0 < delay <= settings.EMAIL_OUTBOX_RETRY_DELAY
+
+        send_emails()
+        email.refresh_from_db()
+        assert email.attempts == 1, (
+            "Проверьте, что письмо не отправляется до истечения задержки."
+        )
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        output = send_emails()
+        assert "исчерпаны попытки: 1" in output
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        monkeypatch.undo()
+        send_emails()
+        assert len(mail.outbox) == 0, (
+            "Письмо, исчерпавшее попытки, не должно отправляться."
+        )
+
+    def test_02_01_reconnect_after_disconnect(self, client, settings):
+        settings.EMAIL_BACKEND = "tests.test_09_emails.FlakyBackend"
+        self.signup(client, 4)
+        output = send_emails()
+        assert "ошибок с повтором: 1" in output, (
+            "Проверьте, что после обрыва соединение открывается заново "
+            "и остальные письма пачки уходят."
+        )
+        assert len(mail.outbox) == 3
+
+    def test_02_02_server_down(self, client, settings):
+        settings.EMAIL_BACKEND = "tests.test_09_emails.DownBackend"
+        self.signup(client, 2)
+        output = send_emails()
+        assert "ошибок соединения: 1" in output
+        assert not OutgoingEmail.objects.exclude(attempts=0).exists(), (
+            "Проверьте, что недоступный сервер не тратит попыток писем."
+        )
+
+    def test_02_03_claim_is_exclusive(self, client):
+        self.signup(client, 3)
+        assert len(claim_batch(10)) == 3
+        assert claim_batch(10) == []
+
+    def test_03_mail_log_backend(self, client, settings, tmp_path):
+        settings.EMAIL_BACKEND = "users.maillog.EmailBackend"
+        settings.EMAIL_FILE_PATH = tmp_path
+        settings.EMAIL_LOG_SEGMENT_SIZE = 1024
+        self.signup(client, 10)
+        send_emails()
+
+        segments = sorted(path.name for path in tmp_path.glob("*.log.gz"))
+        assert len(segments) > 1, (
+            "Проверьте, что журнал писем делится на сегменты по размеру."
+        )
+        for idx in range(10):
+            response = client.post(
+                "/api/v1/auth/token/",
+                data={
+                    "username": f"user{idx}",
+                    "confirmation_code": latest_code(f"user{idx}@yamdb.fake"),
+                },
+            )
+            assert response.status_code == HTTPStatus.OK, (
+                "Проверьте, что `latest_code` находит код из последнего "
+                "письма на адрес."
+            )
+        assert latest_code("unknown@yamdb.fake") is None
+
+    def test_04_mail_log_keeps_latest_message(self, tmp_path):
+        log = MailLog(tmp_path, segment_size=10**6, compress=False)
+        log.open()
+        for code in ("111111", "222222"):
+            log.append(
+                [
+                    EmailMessage(
+                        subject="Код",
+                        body=f"Ваш код: {code}",
+                        to=["User@yamdb.fake"],
+                    )
+                ]
+            )
+        log.close()
+        assert latest_code("user@yamdb.fake", tmp_path) == "222222"
+        assert [path.name for path in tmp_path.glob("*.log")] == [
+            "000001.log"
+        ]
@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.cache import cached_users
+from users import otp
+from users.models import OtpCode
+
+URL_TOKEN = "/api/v1/auth/token/"
+
+
+@pytest.mark.django_db(transaction=True)
+class Test10StatelessOtp:
+
+    def get_token(self, client, user, code):
+        return client.post(
+            URL_TOKEN,
+            data={"username": user.username, "confirmation_code": code},
+        )
+
+    def test_01_code_is_single_use(self, client, user):
+        code = otp.make_code(user)
+        response = self.get_token(client, user, code)
+        assert response.status_code == HTTPStatus.OK
+        assert "token" in response.json()
+
+        user.refresh_from_db()
+        assert user.otp_nonce == 1
+        response = self.get_token(client, user, code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST, (
+            "Проверьте, что код подтверждения нельзя использовать дважды."
+        )
+
+    def test_01_02_consumed_code_drops_cached_user(
+        self, client, user, user_client
+    ):
+        # Запрос на запись кладёт пользователя в кэш процесса.
+        user_client.delete("/api/v1/genres/missing/")
+        assert cached_users.get(user.pk) is not None
+        response = self.get_token(client, user, otp.make_code(user))
+        assert response.status_code == HTTPStatus.OK
+        assert cached_users.get(user.pk) is None, (
+            "Проверьте, что погашение кода сбрасывает закэшированного "
+            "пользователя со старым otp_nonce."
+        )
+
+    def test_02_code_lifetime(self, client, user, settings, monkeypatch):
+        code = otp.make_code(user)
+        issued = time.time()
+        lifetime = settings.OTP_LIFETIME.total_seconds()
+        window = settings.OTP_WINDOW.total_seconds()
+
+        monkeypatch.setattr(time, "time", lambda: issued + lifetime - window)
+        assert otp.check_code(user, code)
+        monkeypatch.setattr(time, "time", lambda: issued + lifetime + 1)
+        assert not otp.check_code(user, code), (
+            "Проверьте, что код перестаёт действовать через OTP_LIFETIME."
+        )
+        response = self.get_token(client, user, code)
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    def test_03_code_depends_on_user(self, user, admin):
+        window = otp.current_window()
+        assert otp.make_code(user, window) != otp.make_code(admin, window)
+        assert not otp.check_code(user, "12345")
+        assert not otp.check_code(user, otp.make_code(admin))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_purge_otp_codes():
+    now = timezone.now()
+    for idx in range(5):
+        OtpCode.objects.create(
+            email=f"old{idx}@yamdb.fake",
+            code="123456",
+            expired=now - timedelta(minutes=idx + 1),
+        )
+    OtpCode.objects.create(
+        email="fresh@yamdb.fake",
+        code="123456",
+        expired=now + timedelta(minutes=60),
+    )
+    out = StringIO()
+    call_command("purge_otp_codes", batch_size=2, stdout=out)
+    assert list(OtpCode.objects.values_list("email", flat=True)) == [
+        "fresh@yamdb.fake"
+    ]
+    assert "Удалено просроченных кодов: 5, пачек: 3" in out.getvalue()
@@ -0,0 +1,96 @@
+from http import HTTPStatus
+
+import pytest
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.cache_backends import SQLiteCache
+from api.throttling import AuthIdentityThrottle
+
+URL_SIGNUP = "/api/v1/auth/signup/"
+URL_TOKEN = "/api/v1/auth/token/"
+
+
+@pytest.mark.django_db(transaction=True)
+class Test11AuthThrottling:
+
+    def test_01_identity_limit(self, client):
+        data = {"username": "bot", "email": "bot@yamdb.fake"}
+        for _ in range(5):
+            response = client.post(URL_SIGNUP, data=data)
+            assert response.status_code == HTTPStatus.OK
+        response = client.post(URL_SIGNUP, data=data)
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            f"Проверьте, что `{URL_SIGNUP}` ограничивает число запросов "
+            "для одного username и email."
+        )
+        assert int(response["Retry-After"]) > 0, (
+            "Проверьте, что ответ 429 содержит заголовок `Retry-After`."
+        )
+
+        response = client.post(
+            URL_TOKEN, data={"username": "BOT", "confirmation_code": "1"}
+        )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+
+        response = client.post(
+            URL_SIGNUP, data={"username": "bot", "email": "other@yamdb.fake"}
+        )
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS, (
+            "Проверьте, что лимит для username не обходится сменой email."
+        )
+
+    def test_02_ip_limit(self, client):
+        statuses = [
+            client.post(
+                URL_TOKEN,
+                data={"username": f"user{idx}", "confirmation_code": "1"},
+            ).status_code
+            for idx in range(31)
+        ]
+        assert HTTPStatus.TOO_MANY_REQUESTS not in statuses[:30]
+        assert statuses[30] == HTTPStatus.TOO_MANY_REQUESTS, (
+            f"Проверьте, что `{URL_TOKEN}` ограничивает число запросов "
+            "с одного IP-адреса."
+        )
+        response = client.post(
+            URL_SIGNUP,
+            data={"username": "other", "email": "other@yamdb.fake"},
+            REMOTE_ADDR="10.0.0.1",
+        )
+        assert response.status_code == HTTPStatus.OK
+
+
+def test_sqlite_cache(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), {})
+    cache.set("key", {"value": 1})
+    assert cache.get("key") == {"value": 1}
+    assert not cache.add("key", 2)
+    assert cache.add("other", 2, timeout=0)
+    assert cache.get("other") is None
+    assert cache.add("other", 3)
+    assert cache.get_many(["key", "other", "missing"]) == {
+        "key": {"value": 1},
+        "other": 3,
+    }
+    assert cache.incr("other") == 4
+    assert cache.delete("key")
+    assert not cache.has_key("key")
+    cache.clear()
+    assert cache.get("other") is None
+
+
+def test_identity_keys_are_hashed():
+    email = "a" * 300 + "@yamdb.fake"
+    request = APIRequestFactory().post(
+        URL_SIGNUP, {"username": "<bot> x", "email": email}, format="json"
+    )
+    throttle = AuthIdentityThrottle()
+    keys = throttle.get_cache_keys(
+        Request(request, parsers=[JSONParser()]), None
+    )
+    assert len(keys) == 2
+    assert all(len(key) < 100 and " " not in key for key in keys), (
+        "Проверьте, что username и email не попадают в ключ кэша как есть."
+    )
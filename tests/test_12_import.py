@@ -0,0 +1,99 @@
+import random
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from reviews.management.commands.generate_dataset import (
+    Command as GenerateCommand,
+)
+from reviews.management.commands.run_all_commands import Command
+from reviews.models import Category, Review
+
+
+def run_import(tmp_path, **options):
+    out = StringIO()
+    call_command(
+        "run_all_commands",
+        data_dir=str(tmp_path),
+        checkpoint_file=str(tmp_path / "checkpoint.json"),
+        reject_file=str(tmp_path / "rejects.csv"),
+        stdout=out,
+        **options,
+    )
+    return out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class Test12Import:
+
+    def test_01_existing_rows_are_not_counted_as_inserted(self, tmp_path):
+        (tmp_path / "category.csv").write_text(
+            "id,name,slug\n1,Фильм,movie\n2,Книга,book\n", encoding="utf-8"
+        )
+        Category.objects.create(id=1, name="Фильм", slug="movie")
+
+        output = run_import(tmp_path)
+
+        assert Category.objects.count() == 2
+        assert "1 добавлено, 1 уже существовали, 0 с ошибками" in output, (
+            "Проверьте, что команда импорта сообщает число действительно "
+            "добавленных строк, а не отправленных в базу."
+        )
+
+    def test_02_rejects_are_written_after_commit(self, tmp_path, monkeypatch):
+        (tmp_path / "category.csv").write_text(
+            "id,name,slug\n1,Фильм,movie\nx,Книга,book\n", encoding="utf-8"
+        )
+        reject_path = tmp_path / "rejects.csv"
+        flush = Command.flush
+
+        def failing_flush(self, model, batch):
+            raise RuntimeError("сбой базы")
+
+        monkeypatch.setattr(Command, "flush", failing_flush)
+        with pytest.raises(CommandError):
+            run_import(tmp_path)
+        assert reject_path.read_text(encoding="utf-8").splitlines() == [
+            "file,row,error,data"
+        ], (
+            "Проверьте, что отклонённые строки порции не записываются, "
+            "если её транзакция откатилась."
+        )
+
+        monkeypatch.setattr(Command, "flush", flush)
+        run_import(tmp_path, resume=True)
+        rejects = reject_path.read_text(encoding="utf-8").splitlines()
+        assert len(rejects) == 2
+        assert rejects[1].startswith("category.csv,2,")
+        assert Category.objects.count() == 1
+
+    def test_03_review_counts_keep_total(self):
+        command = GenerateCommand()
+        command.random = random.Random(42)
+        command.zipf = 1.1
+        counts = command.review_counts(titles=100, reviews=3000, users=200)
+        assert sum(counts) == 3000, (
+            "Проверьте, что отзывы сверх числа пользователей достаются "
+            "другим произведениям, а не теряются."
+        )
+        assert max(counts) == 200
+
+    def test_04_generate_dataset_writes_rejects_to_cwd(
+        self, tmp_path, monkeypatch
+    ):
+        monkeypatch.chdir(tmp_path)
+        call_command(
+            "generate_dataset",
+            users=5,
+            titles=3,
+            reviews=20,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+        assert Review.objects.count() == 15
+        assert (tmp_path / "import_rejects.csv").exists(), (
+            "Проверьте, что при загрузке в базу файл отклонённых строк "
+            "сохраняется в текущем каталоге, а не во временном."
+        )
@@ -0,0 +1,49 @@
+from http import HTTPStatus
+
+import pytest
+
+from reviews.models import Category, Review, Title
+
+
+@pytest.mark.django_db(transaction=True)
+class Test13SearchAPI:
+
+    def test_01_full_text_search(self, client, user, many_titles):
+        category = Category.objects.get()
+        title = Title.objects.create(
+            name="Сталкер",
+            year=1979,
+            category=category,
+            description="Путешествие в Зону к комнате желаний.",
+        )
+        review = Review.objects.create(
+            title=many_titles[0], author=user, text="Зона впечатляет", score=9
+        )
+        response = client.get("/api/v1/search/", {"q": "зон"})
+        assert response.status_code == HTTPStatus.OK
+        results = response.json()["results"]
+        assert {(item["type"], item["id"]) for item in results} == {
+            ("title", title.id),
+            ("review", review.id),
+        }
+        assert all("<mark>" in item["snippet"] for item in results)
+
+        review.text = "Зона <script>alert(1)</script>"
+        review.save()
+        response = client.get(
+            "/api/v1/search/", {"q": "зона", "type": "review"}
+        )
+        assert response.json()["results"][0]["snippet"] == (
+            "<mark>Зона</mark> &lt;script&gt;alert(1)&lt;/script&gt;"
+        ), "Проверьте, что текст во фрагменте экранируется."
+
+        review.delete()
+        title.description = ""
+        title.save()
+        response = client.get("/api/v1/search/", {"q": "зона"})
+        assert response.json()["results"] == [], (
+            "Проверьте, что поисковый индекс обновляется при изменении "
+            "и удалении произведений и отзывов."
+        )
+        response = client.get("/api/v1/search/")
+        assert response.status_code == HTTPStatus.BAD_REQUEST
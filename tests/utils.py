@@ -1,5 +1,9 @@
 from http import HTTPStatus
 
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 check_name_and_slug_patterns = (
     (
         {"name": "a" * 256 + "simbols", "slug": "longname"},
@@ -291,3 +295,21 @@ def check_fields(obj_type, url_pattern, obj, expected_data, detail=False):
         f"данные {obj_types[obj_type]}{results_in_msg}. Поле `id` не "
         "найдено или не является целым числом."
     )
+
+
+def check_query_count(client, url, expected_count, limits=(1, 10, 500)):
+    for limit in limits:
+        # Проверяется запрос с холодным кэшем.
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, {"limit": limit} if limit else {})
+        assert response.status_code == HTTPStatus.OK, (
+            f"Проверьте, что GET-запрос к `{url}?limit={limit}` возвращает "
+            "ответ со статусом 200."
+        )
+        queries_count = len(context.captured_queries)
+        assert queries_count == expected_count, (
+            f"Проверьте, что GET-запрос к `{url}?limit={limit}` выполняет "
+            f"{expected_count} SQL-запроса(ов) независимо от размера "
+            f"страницы. Сейчас выполнено: {queries_count}."
+        )